@@ -11,168 +11,257 @@ Compares token usage between:
 Validates the claim: "UCPL usage means spending less tokens"
 """
 
+import os
 import sys
+import hashlib
+import functools
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 import re
 
-try:
-    import tiktoken
-    HAS_TIKTOKEN = True
-except ImportError:
-    HAS_TIKTOKEN = False
-    print("⚠️  Warning: tiktoken not installed. Using approximate token counts (4 chars ≈ 1 token)")
-    print("   Install with: pip install tiktoken\n")
+import token_count
+
+
+def _memoize_by_digest(method):
+    """Cache a text -> text method by a blake2b digest of its argument."""
+    cache: Dict[bytes, str] = {}
+
+    @functools.wraps(method)
+    def wrapper(self, text: str) -> str:
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        result = cache.get(key)
+        if result is None:
+            result = cache[key] = method(self, text)
+        return result
+
+    return wrapper
+
+
+# Expansion handlers for TokenAnalyzer.DISPATCH, one per named group. Each
+# receives the line's match object and returns the expanded text, or None to
+# drop the line.
+
+def _expand_role(match: re.Match) -> str:
+    return f"You are a {match['role']}."
+
+
+def _expand_task(match: re.Match) -> str:
+    primary, sep, focus = match['task'].partition('|')
+    if sep:
+        return f"Your task is to {primary} with focus on {focus.replace('|', ', ')}."
+    return f"Your task is to {primary}."
+
+
+def _expand_scope(match: re.Match) -> str:
+    return f"Limit your work to {match['scope']}."
+
+
+def _expand_out(match: re.Match) -> str:
+    return f"Output format: {match['out'].replace('+', ' and ')}."
+
+
+def _expand_principles(match: re.Match) -> str:
+    return f"Follow these principles: {match['principles'].replace('+', ', ')}."
+
+
+def _expand_must(match: re.Match) -> str:
+    return f"MUST: {match['must']}"
+
+
+def _expand_optional(match: re.Match) -> str:
+    return f"OPTIONAL: {match['optional']}"
+
+
+def _expand_avoid(match: re.Match) -> str:
+    return f"AVOID: {match['avoid']}"
+
+
+def _expand_define(match: re.Match) -> str:
+    return f"Define a reusable function called '{match['define'].rstrip(':')}' that:"
+
+
+def _expand_use(match: re.Match) -> str:
+    return f"Execute the {match['use']} function."
+
+
+def _expand_workflow(match: re.Match) -> str:
+    return "Execute the following workflow:"
+
+
+def _expand_chain(match: re.Match) -> str:
+    return "Run these steps in sequence:"
+
+
+def _expand_condition(match: re.Match) -> str:
+    return f"If {match['condition']}, then:"
+
+
+def _expand_loop(match: re.Match) -> str:
+    return "Repeat the following:"
+
+
+def _expand_until(match: re.Match) -> str:
+    return f"Continue until {match['until']}."
+
+
+def _expand_variable(match: re.Match) -> str:
+    return f"Store the result in variable ${match['variable']}."
+
+
+def _expand_tool(match: re.Match) -> Optional[str]:
+    # Lines starting with '@@' that don't parse as a tool call are dropped
+    if not match['category']:
+        return None
+    category, subcategory, params = match.group('category', 'subcategory', 'params')
+    return (
+        f"MUST: Use available {category} tool (subcategory: {subcategory}) "
+        f"with parameters: {params or 'none'}."
+    )
 
 
 class TokenAnalyzer:
     """Analyzes token efficiency of UCPL vs natural language."""
 
-    def __init__(self):
-        if HAS_TIKTOKEN:
-            # Use Claude tokenizer approximation (similar to GPT-4)
-            self.encoder = tiktoken.encoding_for_model("gpt-4")
-        else:
-            self.encoder = None
+    COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+    YAML_DELIMITER_RE = re.compile(r'^---\s*$', re.MULTILINE)
+
+    # Line classifier for expand_ucpl_simple. Alternatives are tried in order,
+    # so the first matching branch wins exactly like an if/elif chain; the
+    # name of the matched group (match.lastgroup) selects the handler.
+    DISPATCH = re.compile(
+        r'@role:(?P<role>.*)'
+        r'|@task:(?P<task>.*)'
+        r'|@scope:(?P<scope>.*)'
+        r'|@out:(?P<out>.*)'
+        r'|@principles:(?P<principles>.*)'
+        r'|!(?P<must>.*)'
+        r'|\?(?P<optional>.*)'
+        r'|~(?P<avoid>.*)'
+        r'|@def \s*(?P<define>\S+)'
+        r'|@use \s*(?P<use>\S+)'
+        r'|(?P<workflow>@workflow:)'
+        r'|(?P<chain>@chain:)'
+        r'|.*?@if (?P<condition>(?:(?!@if )[^:])*)'
+        r'|(?P<loop>.*?@loop:)'
+        r'|.*?@until (?P<until>(?:(?!@until ).)*)'
+        r'|.*?> \$(?P<variable>(?:(?!> \$).)*)'
+        r'|(?P<tool>@@(?:(?P<category>\w+):(?P<subcategory>\w+)(?:\[(?P<params>.*?)\])?)?)'
+    )
+
+    HANDLERS = {
+        'role': _expand_role,
+        'task': _expand_task,
+        'scope': _expand_scope,
+        'out': _expand_out,
+        'principles': _expand_principles,
+        'must': _expand_must,
+        'optional': _expand_optional,
+        'avoid': _expand_avoid,
+        'define': _expand_define,
+        'use': _expand_use,
+        'workflow': _expand_workflow,
+        'chain': _expand_chain,
+        'condition': _expand_condition,
+        'loop': _expand_loop,
+        'until': _expand_until,
+        'variable': _expand_variable,
+        'tool': _expand_tool,
+    }
+
+    def __init__(self, num_threads: Optional[int] = None):
+        # Use Claude tokenizer approximation (similar to GPT-4); None without tiktoken
+        self.encoder = token_count.get_encoder()
+        # Tokenizer threads per batch call (None: one per core)
+        self.num_threads = num_threads
 
     def count_tokens(self, text: str) -> int:
         """Count tokens in text using tiktoken or approximation."""
-        if self.encoder:
-            return len(self.encoder.encode(text))
-        else:
-            # Rough approximation: 1 token ≈ 4 characters
-            return len(text) // 4
+        return token_count.count_tokens(text, self.encoder)
+
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """Count tokens for several texts with a single tokenizer call."""
+        return token_count.count_tokens_batch(texts, self.encoder, self.num_threads)
 
     def extract_ucpl_content(self, file_path: Path) -> str:
         """Extract UCPL content (excluding YAML header)."""
-        content = file_path.read_text(encoding='utf-8')
-
-        # Remove comment line
-        content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
-
-        # Find YAML delimiters
-        matches = list(re.finditer(r'^---\s*$', content, re.MULTILINE))
-
-        if len(matches) >= 2:
+        return self.strip_header(token_count.read_text(str(file_path)))
+
+    @_memoize_by_digest
+    def strip_header(self, content: str) -> str:
+        """Strip comments and the YAML header from UCPL source text."""
+        # Remove comment line (plain substring test skips the regex when absent)
+        if '<!--' in content:
+            content = self.COMMENT_RE.sub('', content)
+
+        # Find YAML delimiters (only the closing one is needed)
+        closing = None
+        if '---' in content:
+            delimiters = self.YAML_DELIMITER_RE.finditer(content)
+            next(delimiters, None)
+            closing = next(delimiters, None)
+
+        if closing is not None:
             # Extract content after second delimiter
-            return content[matches[1].end():].strip()
+            return content[closing.end():].strip()
 
         return content.strip()
 
+    @_memoize_by_digest
     def expand_ucpl_simple(self, ucpl: str) -> str:
         """
         Simple UCPL expansion for estimation.
         Real expansion would be more verbose.
         """
-        lines = ucpl.split('\n')
+        lines = [line.strip() for line in ucpl.splitlines()]
         expanded = []
+        append = expanded.append
+        dispatch = self.DISPATCH.match
+        handlers = self.HANDLERS
 
         for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
+            if not line or line[0] == '#':
+                continue
+
+            match = dispatch(line)
+            if match is None:
+                # Default: add as instruction
+                append(line)
                 continue
 
-            # Directives
-            if line.startswith('@role:'):
-                role = line.split(':', 1)[1]
-                expanded.append(f"You are a {role}.")
-
-            elif line.startswith('@task:'):
-                task = line.split(':', 1)[1]
-                parts = task.split('|')
-                if len(parts) > 1:
-                    expanded.append(f"Your task is to {parts[0]} with focus on {', '.join(parts[1:])}.")
-                else:
-                    expanded.append(f"Your task is to {task}.")
-
-            elif line.startswith('@scope:'):
-                scope = line.split(':', 1)[1]
-                expanded.append(f"Limit your work to {scope}.")
-
-            elif line.startswith('@out:'):
-                out = line.split(':', 1)[1].replace('+', ' and ')
-                expanded.append(f"Output format: {out}.")
-
-            elif line.startswith('@principles:'):
-                principles = line.split(':', 1)[1].replace('+', ', ')
-                expanded.append(f"Follow these principles: {principles}.")
-
-            # Constraints
-            elif line.startswith('!'):
-                constraint = line[1:]
-                expanded.append(f"MUST: {constraint}")
-
-            elif line.startswith('?'):
-                optional = line[1:]
-                expanded.append(f"OPTIONAL: {optional}")
-
-            elif line.startswith('~'):
-                avoid = line[1:]
-                expanded.append(f"AVOID: {avoid}")
-
-            # Macros
-            elif line.startswith('@def '):
-                macro_name = line.split()[1].rstrip(':')
-                expanded.append(f"Define a reusable function called '{macro_name}' that:")
-
-            elif line.startswith('@use '):
-                macro_name = line.split()[1]
-                expanded.append(f"Execute the {macro_name} function.")
-
-            # Workflows
-            elif line.startswith('@workflow:'):
-                expanded.append("Execute the following workflow:")
-
-            elif line.startswith('@chain:'):
-                expanded.append("Run these steps in sequence:")
-
-            # Conditionals
-            elif '@if ' in line:
-                condition = line.split('@if ')[1].split(':')[0]
-                expanded.append(f"If {condition}, then:")
-
-            elif '@loop:' in line:
-                expanded.append("Repeat the following:")
-
-            elif '@until ' in line:
-                condition = line.split('@until ')[1]
-                expanded.append(f"Continue until {condition}.")
-
-            # Variables
-            elif '> $' in line:
-                var = line.split('> $')[1]
-                expanded.append(f"Store the result in variable ${var}.")
-
-            # Tool invocations
-            elif line.startswith('@@'):
-                tool_match = re.match(r'@@(\w+):(\w+)(?:\[(.*?)\])?', line)
-                if tool_match:
-                    category, subcategory, params = tool_match.groups()
-                    expanded.append(
-                        f"MUST: Use available {category} tool (subcategory: {subcategory}) "
-                        f"with parameters: {params or 'none'}."
-                    )
-
-            # Default: add as instruction
-            elif line.strip():
-                expanded.append(line)
+            text = handlers[match.lastgroup](match)
+            if text is not None:
+                append(text)
 
         return '\n'.join(expanded)
 
     def analyze_file(self, ucpl_file: Path, uuip_file: Path) -> Dict:
         """Analyze token efficiency for a UCPL file."""
+        return self.analyze_files([ucpl_file], uuip_file)[0]
 
-        # Read files
-        ucpl_content = self.extract_ucpl_content(ucpl_file)
-        uuip_content = uuip_file.read_text(encoding='utf-8')
+    def analyze_files(self, ucpl_files: List[Path], uuip_file: Path) -> List[Dict]:
+        """Analyze token efficiency for several UCPL files sharing one UUIP."""
 
-        # Expand UCPL
-        expanded_content = self.expand_ucpl_simple(ucpl_content)
+        # Read and expand every file up front
+        ucpl_contents = [self.extract_ucpl_content(ucpl_file) for ucpl_file in ucpl_files]
+        expanded_contents = [self.expand_ucpl_simple(content) for content in ucpl_contents]
+        uuip_content = token_count.read_text(str(uuip_file))
 
-        # Count tokens
-        ucpl_tokens = self.count_tokens(ucpl_content)
-        uuip_tokens = self.count_tokens(uuip_content)
-        expanded_tokens = self.count_tokens(expanded_content)
+        # Count tokens for all files in one batched tokenizer call
+        # (the shared UUIP is counted once)
+        counts = self.count_tokens_batch([uuip_content, *ucpl_contents, *expanded_contents])
+        uuip_tokens = counts[0]
+        ucpl_counts = counts[1:len(ucpl_files) + 1]
+        expanded_counts = counts[len(ucpl_files) + 1:]
+
+        return [
+            self._token_metrics(ucpl_file.name, ucpl_tokens, uuip_tokens, expanded_tokens)
+            for ucpl_file, ucpl_tokens, expanded_tokens in zip(ucpl_files, ucpl_counts, expanded_counts)
+        ]
+
+    @staticmethod
+    def _token_metrics(name: str, ucpl_tokens: int, uuip_tokens: int, expanded_tokens: int) -> Dict:
+        """Derive savings and break-even metrics from raw token counts."""
 
         # Total LLM processing cost (UUIP + expanded UCPL)
         llm_processing_tokens = uuip_tokens + expanded_tokens
@@ -195,7 +284,7 @@ class TokenAnalyzer:
             break_even_uses = 0
 
         return {
-            'file': ucpl_file.name,
+            'file': name,
             'ucpl_tokens': ucpl_tokens,
             'natural_tokens': natural_tokens,
             'uuip_tokens': uuip_tokens,
@@ -211,64 +300,82 @@ class TokenAnalyzer:
     def print_analysis(self, results: Dict):
         """Print detailed analysis results."""
 
-        print(f"\n{'='*70}")
-        print(f"Token Analysis: {results['file']}")
-        print(f"{'='*70}\n")
+        # Collect the report and write it in one call (one stdout write per file)
+        lines = []
+        out = lines.append
+
+        out(f"\n{'='*70}")
+        out(f"Token Analysis: {results['file']}")
+        out(f"{'='*70}\n")
 
-        print("📝 Token Counts:")
-        print(f"  UCPL (compact form):           {results['ucpl_tokens']:>6} tokens")
-        print(f"  Natural language equivalent:   {results['natural_tokens']:>6} tokens")
-        print(f"  UUIP interpreter overhead:     {results['uuip_tokens']:>6} tokens")
-        print(f"  Expanded UCPL:                 {results['expanded_tokens']:>6} tokens")
-        print(f"  LLM processing (UUIP+expanded): {results['llm_processing_tokens']:>6} tokens")
+        out("📝 Token Counts:")
+        out(f"  UCPL (compact form):           {results['ucpl_tokens']:>6} tokens")
+        out(f"  Natural language equivalent:   {results['natural_tokens']:>6} tokens")
+        out(f"  UUIP interpreter overhead:     {results['uuip_tokens']:>6} tokens")
+        out(f"  Expanded UCPL:                 {results['expanded_tokens']:>6} tokens")
+        out(f"  LLM processing (UUIP+expanded): {results['llm_processing_tokens']:>6} tokens")
 
-        print("\n💰 Savings Analysis:")
-        print(f"  Authoring savings:             {results['authoring_savings']:>+6} tokens ({results['authoring_savings_pct']:>+6.1f}%)")
-        print(f"  Processing overhead:           {results['processing_overhead']:>+6} tokens ({results['processing_overhead_pct']:>+6.1f}%)")
+        out("\n💰 Savings Analysis:")
+        out(f"  Authoring savings:             {results['authoring_savings']:>+6} tokens ({results['authoring_savings_pct']:>+6.1f}%)")
+        out(f"  Processing overhead:           {results['processing_overhead']:>+6} tokens ({results['processing_overhead_pct']:>+6.1f}%)")
 
         if results['break_even_uses'] > 0:
-            print(f"\n📊 Break-even Analysis:")
-            print(f"  Break-even point:              {results['break_even_uses']:>6.1f} uses")
-            print(f"  (UUIP overhead amortizes after ~{int(results['break_even_uses'])} prompt uses)")
+            out(f"\n📊 Break-even Analysis:")
+            out(f"  Break-even point:              {results['break_even_uses']:>6.1f} uses")
+            out(f"  (UUIP overhead amortizes after ~{int(results['break_even_uses'])} prompt uses)")
 
-        print("\n✅ Verdict:")
+        out("\n✅ Verdict:")
         if results['authoring_savings'] > 0:
-            print(f"  ✓ UCPL saves {results['authoring_savings_pct']:.1f}% tokens for authoring")
+            out(f"  ✓ UCPL saves {results['authoring_savings_pct']:.1f}% tokens for authoring")
 
         if results['break_even_uses'] <= 1:
-            print(f"  ✓ Immediate net savings (no UUIP overhead)")
+            out(f"  ✓ Immediate net savings (no UUIP overhead)")
         elif results['break_even_uses'] <= 5:
-            print(f"  ✓ Net savings after ~{int(results['break_even_uses'])} uses (low overhead)")
+            out(f"  ✓ Net savings after ~{int(results['break_even_uses'])} uses (low overhead)")
         elif results['break_even_uses'] <= 20:
-            print(f"  ~ Net savings after ~{int(results['break_even_uses'])} uses (moderate overhead)")
+            out(f"  ~ Net savings after ~{int(results['break_even_uses'])} uses (moderate overhead)")
         else:
-            print(f"  ⚠ High overhead: needs ~{int(results['break_even_uses'])} uses to break even")
+            out(f"  ⚠ High overhead: needs ~{int(results['break_even_uses'])} uses to break even")
 
         # Overall recommendation
-        print("\n💡 Recommendation:")
+        out("\n💡 Recommendation:")
         if results['authoring_savings_pct'] > 50:
-            print("  UCPL provides SIGNIFICANT authoring efficiency")
+            out("  UCPL provides SIGNIFICANT authoring efficiency")
         elif results['authoring_savings_pct'] > 30:
-            print("  UCPL provides GOOD authoring efficiency")
+            out("  UCPL provides GOOD authoring efficiency")
         else:
-            print("  UCPL provides MODEST authoring efficiency")
+            out("  UCPL provides MODEST authoring efficiency")
 
         if results['break_even_uses'] <= 10:
-            print("  UUIP overhead is REASONABLE for reusable prompts")
+            out("  UUIP overhead is REASONABLE for reusable prompts")
         else:
-            print("  UUIP overhead is HIGH - consider inline expansion for one-off prompts")
+            out("  UUIP overhead is HIGH - consider inline expansion for one-off prompts")
+
+        sys.stdout.write('\n'.join(lines) + '\n')
+
+
+def _analyze_shard(ucpl_files: List[Path], uuip_file: Path) -> List[Dict]:
+    """Analyze a shard of files in a worker process (see main)."""
+    # The shards already use every core, so each tokenizes on one thread
+    return TokenAnalyzer(num_threads=1).analyze_files(ucpl_files, uuip_file)
 
 
 def main():
     """Main entry point."""
 
     if len(sys.argv) < 2:
-        print("Usage: python analyze_token_efficiency.py <ucpl_file> [uuip_file]")
+        print("Usage: python analyze_token_efficiency.py <ucpl_file|glob> [uuip_file]")
         print("\nAnalyzes token efficiency of UCPL vs natural language prompts.")
         print("\nIf uuip_file is not provided, uses CLAUDE.md as default.")
+        print("Quote glob patterns (e.g. 'examples/*.ucpl') to analyze many files in parallel.")
         sys.exit(1)
 
-    ucpl_file = Path(sys.argv[1])
+    # Warned here rather than at import, so spawned workers stay quiet
+    if not token_count.HAS_TIKTOKEN:
+        print("⚠️  Warning: tiktoken not installed. Using approximate token counts (word/punctuation estimate)")
+        print("   Install with: pip install tiktoken\n")
+
+    pattern = sys.argv[1]
 
     if len(sys.argv) > 2:
         uuip_file = Path(sys.argv[2])
@@ -281,8 +388,12 @@ def main():
             print("Error: CLAUDE.md (UUIP) not found. Please specify path.")
             sys.exit(1)
 
-    if not ucpl_file.exists():
-        print(f"Error: UCPL file not found: {ucpl_file}")
+    ucpl_files = token_count.expand_paths(pattern)
+    if not ucpl_files:
+        print(f"Error: No UCPL files match: {pattern}")
+        sys.exit(1)
+    if not ucpl_files[0].exists():
+        print(f"Error: UCPL file not found: {ucpl_files[0]}")
         sys.exit(1)
 
     if not uuip_file.exists():
@@ -290,8 +401,24 @@ def main():
         sys.exit(1)
 
     analyzer = TokenAnalyzer()
-    results = analyzer.analyze_file(ucpl_file, uuip_file)
-    analyzer.print_analysis(results)
+
+    workers = min(os.cpu_count() or 1, len(ucpl_files))
+    if workers == 1:
+        all_results = analyzer.analyze_files(ucpl_files, uuip_file)
+    else:
+        # Files are independent, so split them into one contiguous shard per
+        # process; each worker loads its encoder once and batch-counts its shard.
+        shard_size = -(-len(ucpl_files) // workers)
+        shards = [ucpl_files[start:start + shard_size] for start in range(0, len(ucpl_files), shard_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            all_results = [
+                results
+                for shard_results in executor.map(_analyze_shard, shards, [uuip_file] * len(shards))
+                for results in shard_results
+            ]
+
+    for results in all_results:
+        analyzer.print_analysis(results)
 
 
 if __name__ == "__main__":
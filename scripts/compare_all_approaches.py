@@ -12,22 +12,13 @@ Compares token usage across:
 
 import sys
 import json
-import subprocess
 from pathlib import Path
 
-try:
-    import tiktoken
-    HAS_TIKTOKEN = True
-except ImportError:
-    HAS_TIKTOKEN = False
+from token_count import count_tokens_batch, get_encoder, read_text
+from ucpl_to_schema import UCPLSchemaConverter
 
-
-def count_tokens(text: str) -> int:
-    """Count tokens."""
-    if HAS_TIKTOKEN:
-        encoder = tiktoken.encoding_for_model("gpt-4")
-        return len(encoder.encode(text))
-    return len(text) // 4
+# GPT-4 encoding, resolved once at import (None when tiktoken is not installed)
+_ENC = get_encoder()
 
 
 def main():
@@ -46,39 +37,30 @@ def main():
         uuip_file = Path("../CLAUDE.md")
 
     # Read files
-    with open(ucpl_file) as f:
-        ucpl_content = f.read()
-
-    with open(uuip_file) as f:
-        uuip_content = f.read()
-
-    # Get structured schema
-    result = subprocess.run(
-        ["python", "scripts/ucpl_to_schema.py", str(ucpl_file), "--output", "compact"],
-        capture_output=True,
-        text=True
+    ucpl_content = read_text(str(ucpl_file))
+    uuip_content = read_text(str(uuip_file))
+
+    # Get structured schema, serialized once as compact JSON. Non-ASCII text is
+    # kept as UTF-8 rather than \uXXXX escapes so the count matches what an LLM
+    # would receive.
+    schema = UCPLSchemaConverter().parse_content(ucpl_content)
+    schema_json = json.dumps(schema, separators=(',', ':'), ensure_ascii=False)
+
+    # Token counts (one batched tokenizer call for all three texts)
+    ucpl_tokens, uuip_tokens, schema_tokens = count_tokens_batch(
+        [ucpl_content, uuip_content, schema_json], _ENC
     )
 
-    if result.returncode != 0:
-        print("Error generating schema")
-        sys.exit(1)
-
-    # Parse output (first line is JSON, second is token estimate)
-    lines = result.stdout.strip().split('\n')
-    schema_json = lines[0] if lines else "{}"
-    schema = json.loads(schema_json)
-
-    # Token counts
-    ucpl_tokens = count_tokens(ucpl_content)
-    uuip_tokens = count_tokens(uuip_content)
-    schema_tokens = count_tokens(schema_json)
-
     # Estimate verbose natural language (2x UCPL for conservative estimate)
     verbose_tokens = ucpl_tokens * 2
 
-    print("\n" + "="*80)
-    print(f"TOKEN COMPARISON: {ucpl_file.name}")
-    print("="*80 + "\n")
+    # The report is collected and written to stdout in a single call
+    lines = []
+    out = lines.append
+
+    out("\n" + "="*80)
+    out(f"TOKEN COMPARISON: {ucpl_file.name}")
+    out("="*80 + "\n")
 
     approaches = [
         {
@@ -121,10 +103,10 @@ def main():
     baseline_tokens = verbose_tokens
 
     for i, approach in enumerate(approaches, 1):
-        print(f"{approach['name']}")
-        print(f"  {approach['description']}")
-        print(f"  {approach['breakdown']}")
-        print(f"  Total: {approach['tokens']} tokens", end="")
+        out(f"{approach['name']}")
+        out(f"  {approach['description']}")
+        out(f"  {approach['breakdown']}")
+        total = f"  Total: {approach['tokens']} tokens"
 
         if not approach['is_baseline']:
             diff = approach['tokens'] - baseline_tokens
@@ -132,59 +114,61 @@ def main():
 
             if diff < 0:
                 symbol = "✅"
-                print(f"  {symbol} {diff} tokens ({pct:.1f}%) SAVINGS")
+                out(f"{total}  {symbol} {diff} tokens ({pct:.1f}%) SAVINGS")
             elif diff > 0:
                 symbol = "⚠️ "
-                print(f"  {symbol} +{diff} tokens (+{pct:.1f}%) OVERHEAD")
+                out(f"{total}  {symbol} +{diff} tokens (+{pct:.1f}%) OVERHEAD")
             else:
-                print(f"  ≈ Same as baseline")
+                out(f"{total}  ≈ Same as baseline")
         else:
-            print()
+            out(total)
 
-        print()
+        out("")
 
     # Summary
     optimal_tokens = schema_tokens
     savings = baseline_tokens - optimal_tokens
     savings_pct = (savings / baseline_tokens * 100)
 
-    print("="*80)
-    print("📊 SUMMARY")
-    print("="*80 + "\n")
-    print(f"Baseline (natural language):     {baseline_tokens:>6} tokens")
-    print(f"Current (UCPL + UUIP):           {uuip_tokens + verbose_tokens:>6} tokens  (+{((uuip_tokens + verbose_tokens) / baseline_tokens * 100) - 100:.0f}% overhead)")
-    print(f"Optimal (Cached UUIP + Schema):  {optimal_tokens:>6} tokens  ({savings_pct:.1f}% savings)")
-    print()
-    print(f"✨ Net savings: {savings} tokens ({savings_pct:.0f}%)")
-    print()
+    out("="*80)
+    out("📊 SUMMARY")
+    out("="*80 + "\n")
+    out(f"Baseline (natural language):     {baseline_tokens:>6} tokens")
+    out(f"Current (UCPL + UUIP):           {uuip_tokens + verbose_tokens:>6} tokens  (+{((uuip_tokens + verbose_tokens) / baseline_tokens * 100) - 100:.0f}% overhead)")
+    out(f"Optimal (Cached UUIP + Schema):  {optimal_tokens:>6} tokens  ({savings_pct:.1f}% savings)")
+    out("")
+    out(f"✨ Net savings: {savings} tokens ({savings_pct:.0f}%)")
+    out("")
 
     # Recommendations
-    print("="*80)
-    print("💡 RECOMMENDATIONS")
-    print("="*80 + "\n")
+    out("="*80)
+    out("💡 RECOMMENDATIONS")
+    out("="*80 + "\n")
 
     if savings_pct > 50:
-        print("✅ EXCELLENT: Optimal approach saves >50% tokens")
-        print("   Implement prompt caching + structured schema immediately")
+        out("✅ EXCELLENT: Optimal approach saves >50% tokens")
+        out("   Implement prompt caching + structured schema immediately")
     elif savings_pct > 30:
-        print("✅ GOOD: Optimal approach saves >30% tokens")
-        print("   Worthwhile to implement for production use")
+        out("✅ GOOD: Optimal approach saves >30% tokens")
+        out("   Worthwhile to implement for production use")
     elif savings_pct > 10:
-        print("⚠️  MODEST: Optimal approach saves >10% tokens")
-        print("   Consider for high-volume use cases")
+        out("⚠️  MODEST: Optimal approach saves >10% tokens")
+        out("   Consider for high-volume use cases")
     else:
-        print("❌ LOW IMPACT: Limited token savings")
-        print("   Focus on authoring efficiency benefits instead")
+        out("❌ LOW IMPACT: Limited token savings")
+        out("   Focus on authoring efficiency benefits instead")
 
-    print()
+    out("")
 
     # Next steps
-    print("🚀 NEXT STEPS:")
-    print("   1. Enable Claude API prompt caching for UUIP")
-    print("   2. Implement UCPL → Schema converter in production")
-    print("   3. Update CLAUDE.md to accept schema format")
-    print("   4. Benchmark end-to-end performance")
-    print()
+    out("🚀 NEXT STEPS:")
+    out("   1. Enable Claude API prompt caching for UUIP")
+    out("   2. Implement UCPL → Schema converter in production")
+    out("   3. Update CLAUDE.md to accept schema format")
+    out("   4. Benchmark end-to-end performance")
+    out("")
+
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 
 if __name__ == "__main__":
@@ -11,216 +11,483 @@ Analyzes multiple scenarios:
 4. Different prompt complexities (simple vs complex)
 """
 
+import io
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import re
+import string
 
-try:
-    import tiktoken
-    HAS_TIKTOKEN = True
-except ImportError:
-    HAS_TIKTOKEN = False
+from token_count import (
+    HAS_TIKTOKEN, count_tokens, count_tokens_batch, expand_paths, get_encoder, read_text,
+)
+
+if not HAS_TIKTOKEN:
     print("⚠️  Warning: tiktoken not installed. Using approximate token counts")
     print("   Install with: pip install tiktoken\n")
 
 
+# Use counts compared in the reusable-prompt scenarios (the report's verdict
+# reads the 5x and 20x entries)
+REUSE_COUNTS = (5, 20)
+
+
+def _compile_template(template: str) -> Tuple[str, ...]:
+    """Split a template at its {slot} fields into literal chunks (N slots -> N + 1 literals)."""
+    literals = ['']
+    for literal, field, _spec, _conversion in string.Formatter().parse(template):
+        literals[-1] += literal
+        if field is not None:
+            literals.append('')
+    return tuple(literals)
+
+
+# Verbose expansion templates, compiled once at import into the literal text
+# around their slots so expansion only writes literals and slot values
+_ROLE_TEMPLATE = _compile_template(
+    "You are acting as a {role}. "
+    "Please adopt the mindset, expertise, and standards "
+    "that are expected of someone in this role."
+)
+_TASK_ASPECTS_TEMPLATE = _compile_template(
+    "Your primary task is to {task}. "
+    "Please pay special attention to the following aspects: "
+    "{aspects}. Make sure to consider each of these "
+    "thoroughly in your work."
+)
+_TASK_TEMPLATE = _compile_template(
+    "Your task is to {task}. Please complete this task "
+    "with careful attention to detail and quality."
+)
+_PRINCIPLES_TEMPLATE = _compile_template(
+    "Please adhere to the following software engineering principles "
+    "throughout your work: {principles}. "
+    "These principles should guide all of your design and implementation decisions."
+)
+_MUST_TEMPLATE = _compile_template(
+    "IMPORTANT: It is mandatory that you {constraint}. "
+    "This is a strict requirement and must not be overlooked. "
+    "Please ensure this is satisfied before proceeding."
+)
+_OPTIONAL_TEMPLATE = _compile_template(
+    "If possible, it would be beneficial to {optional}. "
+    "This is optional and not strictly required, but "
+    "would improve the quality of the output if you can include it."
+)
+_AVOID_TEMPLATE = _compile_template(
+    "Please try to avoid {avoid}. While not strictly forbidden, "
+    "this approach is discouraged and should only be used if "
+    "absolutely necessary with clear justification."
+)
+_DEFINE_TEMPLATE = _compile_template(
+    "\n--- Define Reusable Function: {macro_name} ---\n"
+    "Please create a reusable function or workflow step called "
+    "'{macro_name}' that implements the following logic:"
+)
+_USE_TEMPLATE = _compile_template(
+    "Now, please execute the '{macro_name}' function that was "
+    "defined earlier. Make sure to follow all the steps and "
+    "requirements specified in its definition."
+)
+_WORKFLOW_TEMPLATE = _compile_template(
+    "\n=== Workflow Execution ===\n"
+    "Please execute the following workflow step by step. "
+    "Each step must be completed fully before moving to the next step. "
+    "Do not skip any steps or change the order of execution."
+)
+_CHAIN_TEMPLATE = _compile_template(
+    "Execute these steps in sequence, maintaining the exact order:"
+)
+_CONDITION_TEMPLATE = _compile_template(
+    "Please check the following condition: {condition}. "
+    "If this condition evaluates to true, then execute the following actions:"
+)
+_LOOP_TEMPLATE = _compile_template(
+    "Please repeat the following steps iteratively. "
+    "Continue repeating until the exit condition is met:"
+)
+_UNTIL_TEMPLATE = _compile_template(
+    "Keep repeating the above steps until this condition is satisfied: {condition}. "
+    "Check the condition after each iteration before continuing."
+)
+_VARIABLE_TEMPLATE = _compile_template(
+    "Please store the result of this operation in a variable named '{var}'. "
+    "This variable will be referenced in subsequent steps."
+)
+_TOOL_TEMPLATE = _compile_template(
+    "MANDATORY: You must use an available {category} tool. "
+    "Specifically, use any tool that provides {subcategory} functionality. "
+    "Configure the tool with these parameters: {params}. "
+    "This step cannot be skipped or simulated - actual tool usage is required."
+)
+_OUT_TEMPLATE = _compile_template(
+    "Please format your output as follows: {out}. "
+    "Make sure the output is well-structured and follows this format exactly."
+)
+
+
+# Verbose expansion handlers: each takes a stripped UCPL line and returns
+# its (template, slots) section, or None to emit nothing
+
+def _verbose_role(line: str):
+    return _ROLE_TEMPLATE, (line.partition(':')[2].replace('_', ' '),)
+
+
+def _verbose_task(line: str):
+    task = line.partition(':')[2]
+    primary, bar, aspects = task.partition('|')
+    if bar:
+        return _TASK_ASPECTS_TEMPLATE, (primary, aspects.replace('|', ', '))
+    return _TASK_TEMPLATE, (task,)
+
+
+def _verbose_principles(line: str):
+    return _PRINCIPLES_TEMPLATE, (line.partition(':')[2].replace('+', ', '),)
+
+
+def _verbose_must(line: str):
+    return _MUST_TEMPLATE, (line[1:].replace('_', ' '),)
+
+
+def _verbose_optional(line: str):
+    return _OPTIONAL_TEMPLATE, (line[1:].replace('_', ' '),)
+
+
+def _verbose_avoid(line: str):
+    return _AVOID_TEMPLATE, (line[1:].replace('_', ' '),)
+
+
+def _verbose_define(line: str):
+    macro_name = line.split()[1].rstrip(':').replace('_', ' ')
+    return _DEFINE_TEMPLATE, (macro_name, macro_name)
+
+
+def _verbose_use(line: str):
+    return _USE_TEMPLATE, (line.split()[1].replace('_', ' '),)
+
+
+def _verbose_workflow(line: str):
+    return _WORKFLOW_TEMPLATE, ()
+
+
+def _verbose_chain(line: str):
+    return _CHAIN_TEMPLATE, ()
+
+
+def _verbose_condition(line: str):
+    # Text after the first '@if ', up to the next '@if ' or ':'
+    condition = line.partition('@if ')[2].partition('@if ')[0]
+    return _CONDITION_TEMPLATE, (condition.partition(':')[0],)
+
+
+def _verbose_loop(line: str):
+    return _LOOP_TEMPLATE, ()
+
+
+def _verbose_until(line: str):
+    return _UNTIL_TEMPLATE, (line.partition('@until ')[2].partition('@until ')[0],)
+
+
+def _verbose_variable(line: str):
+    return _VARIABLE_TEMPLATE, (line.partition('> $')[2].partition('> $')[0],)
+
+
+def _is_word(text: str) -> bool:
+    """True if text is non-empty and every character matches regex \\w."""
+    return text.replace('_', 'a').isalnum()
+
+
+def _parse_tool(line: str) -> Optional[Tuple[str, str, Optional[str]]]:
+    """
+    Split '@@category:subcategory[params]' into its parts, exactly like
+    re.match(r'@@(\\w+):(\\w+)(?:\\[(.*?)\\])?', line) but with str.partition.
+    Returns None when the line is not a tool invocation.
+    """
+    category, colon, tail = line[2:].partition(':')
+    if not colon or not _is_word(category):
+        return None
+
+    name, bracket, rest = tail.partition('[')
+    if _is_word(name):
+        params, close, _ = rest.partition(']')
+        return category, name, params if bracket and close else None
+
+    # Subcategory ends at a non-word character other than '[': no params
+    end = 0
+    while end < len(name) and _is_word(name[end]):
+        end += 1
+    if end == 0:
+        return None
+    return category, name[:end], None
+
+
+def _verbose_tool(line: str):
+    tool = _parse_tool(line)
+    if tool is None:
+        return None
+    category, subcategory, params = tool
+    return _TOOL_TEMPLATE, (category, subcategory, params or 'default settings')
+
+
+def _verbose_out(line: str):
+    return _OUT_TEMPLATE, (line.partition(':')[2].replace('+', ' and ').replace('_', ' '),)
+
+
+def _sigil_table(handlers: Dict[str, Callable]) -> Tuple[Optional[Callable], ...]:
+    """Build a 128-entry lookup table mapping ASCII sigils to their handlers."""
+    table = [None] * 128
+    for sigil, handler in handlers.items():
+        table[ord(sigil)] = handler
+    return tuple(table)
+
+
 class ComprehensiveTokenAnalyzer:
     """Analyzes token efficiency across multiple scenarios."""
 
-    def __init__(self):
-        if HAS_TIKTOKEN:
-            self.encoder = tiktoken.encoding_for_model("gpt-4")
-        else:
-            self.encoder = None
+    # Single-character sigils, indexed by the code point of the line's first
+    # character (ASCII only)
+    SIGIL_HANDLERS = _sigil_table({
+        '!': _verbose_must,
+        '?': _verbose_optional,
+        '~': _verbose_avoid,
+    })
+
+    # Line-start '@' directives, keyed by the directive up to and including
+    # its delimiter; these are mutually exclusive
+    PREFIX_HANDLERS = {
+        '@role:': _verbose_role,
+        '@task:': _verbose_task,
+        '@principles:': _verbose_principles,
+        '@def ': _verbose_define,
+        '@use ': _verbose_use,
+        '@workflow:': _verbose_workflow,
+        '@chain:': _verbose_chain,
+    }
+
+    # Directives that may appear anywhere in a line, checked in order
+    INLINE_HANDLERS = (
+        ('@if ', _verbose_condition),
+        ('@loop:', _verbose_loop),
+        ('@until ', _verbose_until),
+        ('> $', _verbose_variable),
+    )
+
+    # Line-start directives that only apply when no inline directive matched
+    LATE_PREFIX_HANDLERS = (
+        ('@@', _verbose_tool),
+        ('@out:', _verbose_out),
+    )
+
+    COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+
+    def __init__(self, verbose: bool = False, exact: bool = False):
+        self.encoder = get_encoder()
+        # Show the full verbose expansion in the report (it is then also
+        # counted exactly, since the text is built anyway)
+        self.verbose = verbose
+        # Build and count the full verbose expansion instead of estimating its
+        # token count from the template counts
+        self.exact = exact
+        # Token counts of each template's literal text, filled on first use
+        self.template_tokens = {}
 
     def count_tokens(self, text: str) -> int:
-        """Count tokens in text."""
-        if self.encoder:
-            return len(self.encoder.encode(text))
-        else:
-            return len(text) // 4  # Approximation
+        """Count tokens in text (memoized by token_count)."""
+        return count_tokens(text, self.encoder)
+
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """Count tokens for several texts in one tokenizer call."""
+        return count_tokens_batch(texts, self.encoder)
 
     def extract_ucpl_content(self, file_path: Path) -> str:
         """Extract UCPL content (excluding YAML header)."""
-        content = file_path.read_text(encoding='utf-8')
-        content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
-        matches = list(re.finditer(r'^---\s*$', content, re.MULTILINE))
-        if len(matches) >= 2:
-            return content[matches[1].end():].strip()
+        content = read_text(str(file_path))
+        if '<!--' in content:
+            content = self.COMMENT_RE.sub('', content)
+
+        # Only the closing YAML delimiter is needed
+        delimiters = self._delimiter_ends(content)
+        if next(delimiters, None) is not None:
+            closing = next(delimiters, None)
+            if closing is not None:
+                return content[closing:].strip()
         return content.strip()
 
-    def create_verbose_expansion(self, ucpl_content: str) -> str:
+    @staticmethod
+    def _delimiter_ends(content: str):
         """
-        Create a VERBOSE natural language expansion.
-        This simulates what a human would write without UCPL.
+        Yield the offset just past the dashes of each '---' delimiter line,
+        i.e. a line that is '---' followed only by whitespace.
         """
-        lines = ucpl_content.split('\n')
-        sections = []
-        current_section = []
-
-        # Estimate verbose expansion by adding context and explanations
-        verbose_multiplier = 2.5  # Natural language is ~2.5x more verbose
-
-        for line in lines:
+        newline = -1  # Virtual newline before the first line
+        while True:
+            if content.startswith('---', newline + 1):
+                dashes_end = newline + 4
+                line_end = content.find('\n', dashes_end)
+                rest = content[dashes_end:] if line_end < 0 else content[dashes_end:line_end]
+                if not rest or rest.isspace():
+                    yield dashes_end
+            newline = content.find('\n---', newline + 1)
+            if newline < 0:
+                return
+
+    def classify_line(self, line: str):
+        """Return the expansion handler for a stripped, non-empty UCPL line (or None)."""
+
+        # Sigils resolve with one table index
+        code = ord(line[0])
+        if code < 128:
+            handler = self.SIGIL_HANDLERS[code]
+            if handler is not None:
+                return handler
+
+        # Only '@' lines can start with a directive
+        directive = line[0] == '@'
+        if directive:
+            prefix_handlers = self.PREFIX_HANDLERS
+            handler = None
+            colon = line.find(':')
+            if colon >= 0:
+                handler = prefix_handlers.get(line[:colon + 1])
+            if handler is None:
+                space = line.find(' ')
+                if space >= 0:
+                    handler = prefix_handlers.get(line[:space + 1])
+            if handler is not None:
+                return handler
+
+        for marker, inline_handler in self.INLINE_HANDLERS:
+            if marker in line:
+                return inline_handler
+
+        if directive:
+            for prefix, late_handler in self.LATE_PREFIX_HANDLERS:
+                if line.startswith(prefix):
+                    return late_handler
+
+        return None
+
+    def classify_lines(self, ucpl_content: str) -> List[Tuple[Callable, str]]:
+        """Pair each directive line of the UCPL content with its expansion handler."""
+        classified = []
+        append = classified.append
+        classify_line = self.classify_line
+
+        for line in ucpl_content.split('\n'):
             line = line.strip()
-            if not line or line.startswith('#'):
+            if not line or line[0] == '#':
                 continue
+            handler = classify_line(line)
+            if handler is not None:
+                append((handler, line))
+
+        return classified
+
+    def iter_sections(self, ucpl_content: str) -> Iterator[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        """Yield the (template, slots) section of each directive line, in order."""
+        for handler, line in self.classify_lines(ucpl_content):
+            section = handler(line)
+            if section is not None:
+                yield section
 
-            # Roles and context
-            if line.startswith('@role:'):
-                role = line.split(':', 1)[1].replace('_', ' ')
-                current_section.append(
-                    f"You are acting as a {role}. "
-                    f"Please adopt the mindset, expertise, and standards "
-                    f"that are expected of someone in this role."
-                )
-
-            elif line.startswith('@task:'):
-                task = line.split(':', 1)[1]
-                parts = task.split('|')
-                if len(parts) > 1:
-                    current_section.append(
-                        f"Your primary task is to {parts[0]}. "
-                        f"Please pay special attention to the following aspects: "
-                        f"{', '.join(parts[1:])}. Make sure to consider each of these "
-                        f"thoroughly in your work."
-                    )
-                else:
-                    current_section.append(
-                        f"Your task is to {task}. Please complete this task "
-                        f"with careful attention to detail and quality."
-                    )
-
-            elif line.startswith('@principles:'):
-                principles = line.split(':', 1)[1].split('+')
-                current_section.append(
-                    f"Please adhere to the following software engineering principles "
-                    f"throughout your work: {', '.join(principles)}. "
-                    f"These principles should guide all of your design and implementation decisions."
-                )
-
-            # Constraints - verbose explanations
-            elif line.startswith('!'):
-                constraint = line[1:].replace('_', ' ')
-                current_section.append(
-                    f"IMPORTANT: It is mandatory that you {constraint}. "
-                    f"This is a strict requirement and must not be overlooked. "
-                    f"Please ensure this is satisfied before proceeding."
-                )
-
-            elif line.startswith('?'):
-                optional = line[1:].replace('_', ' ')
-                current_section.append(
-                    f"If possible, it would be beneficial to {optional}. "
-                    f"This is optional and not strictly required, but "
-                    f"would improve the quality of the output if you can include it."
-                )
-
-            elif line.startswith('~'):
-                avoid = line[1:].replace('_', ' ')
-                current_section.append(
-                    f"Please try to avoid {avoid}. While not strictly forbidden, "
-                    f"this approach is discouraged and should only be used if "
-                    f"absolutely necessary with clear justification."
-                )
-
-            # Macros - verbose function definitions
-            elif line.startswith('@def '):
-                macro_name = line.split()[1].rstrip(':').replace('_', ' ')
-                current_section.append(
-                    f"\n--- Define Reusable Function: {macro_name} ---\n"
-                    f"Please create a reusable function or workflow step called "
-                    f"'{macro_name}' that implements the following logic:"
-                )
-
-            elif line.startswith('@use '):
-                macro_name = line.split()[1].replace('_', ' ')
-                current_section.append(
-                    f"Now, please execute the '{macro_name}' function that was "
-                    f"defined earlier. Make sure to follow all the steps and "
-                    f"requirements specified in its definition."
-                )
-
-            # Workflows
-            elif line.startswith('@workflow:'):
-                current_section.append(
-                    "\n=== Workflow Execution ===\n"
-                    "Please execute the following workflow step by step. "
-                    "Each step must be completed fully before moving to the next step. "
-                    "Do not skip any steps or change the order of execution."
-                )
-
-            elif line.startswith('@chain:'):
-                current_section.append(
-                    "Execute these steps in sequence, maintaining the exact order:"
-                )
-
-            # Conditionals
-            elif '@if ' in line:
-                condition = line.split('@if ')[1].split(':')[0]
-                current_section.append(
-                    f"Please check the following condition: {condition}. "
-                    f"If this condition evaluates to true, then execute the following actions:"
-                )
-
-            elif '@loop:' in line:
-                current_section.append(
-                    "Please repeat the following steps iteratively. "
-                    "Continue repeating until the exit condition is met:"
-                )
-
-            elif '@until ' in line:
-                condition = line.split('@until ')[1]
-                current_section.append(
-                    f"Keep repeating the above steps until this condition is satisfied: {condition}. "
-                    f"Check the condition after each iteration before continuing."
-                )
-
-            # Variables
-            elif '> $' in line:
-                var = line.split('> $')[1]
-                current_section.append(
-                    f"Please store the result of this operation in a variable named '{var}'. "
-                    f"This variable will be referenced in subsequent steps."
-                )
-
-            # Tool invocations
-            elif line.startswith('@@'):
-                tool_match = re.match(r'@@(\w+):(\w+)(?:\[(.*?)\])?', line)
-                if tool_match:
-                    category, subcategory, params = tool_match.groups()
-                    current_section.append(
-                        f"MANDATORY: You must use an available {category} tool. "
-                        f"Specifically, use any tool that provides {subcategory} functionality. "
-                        f"Configure the tool with these parameters: {params or 'default settings'}. "
-                        f"This step cannot be skipped or simulated - actual tool usage is required."
-                    )
-
-            # Output formats
-            elif line.startswith('@out:'):
-                out = line.split(':', 1)[1].replace('+', ' and ').replace('_', ' ')
-                current_section.append(
-                    f"Please format your output as follows: {out}. "
-                    f"Make sure the output is well-structured and follows this format exactly."
-                )
-
-        return '\n\n'.join(current_section)
+    def create_verbose_expansion(self, ucpl_content: str) -> str:
+        """
+        Create a VERBOSE natural language expansion.
+        This simulates what a human would write without UCPL.
+        """
+        buf = io.StringIO()
+        write = buf.write
+        separator = ''
+
+        # Stream each section's literals and slots into the buffer
+        for template, slots in self.iter_sections(ucpl_content):
+            write(separator)
+            separator = '\n\n'
+            write(template[0])
+            for slot, literal in zip(slots, template[1:]):
+                write(slot)
+                write(literal)
+
+        return buf.getvalue()
+
+    def estimate_verbose_tokens(self, ucpl_content: str) -> int:
+        """
+        Estimate the token count of the verbose expansion without building it.
+        Sums the (cached) template literal counts, the variable slots and the
+        section separators. Tokens that BPE would merge across those joins are
+        not seen, so the estimate can differ from the exact count by about
+        one token per join.
+        """
+        template_tokens = self.template_tokens
+        total = 0
+        sections = 0
+        slot_texts = []
+
+        for template, slots in self.iter_sections(ucpl_content):
+            tokens = template_tokens.get(template)
+            if tokens is None:
+                tokens = template_tokens[template] = sum(self.count_tokens_batch(list(template)))
+            total += tokens
+            slot_texts.extend(slots)
+            sections += 1
+
+        # Variable slots are the only text tokenized per call
+        total += sum(self.count_tokens_batch(slot_texts))
+        if sections > 1:
+            total += self.count_tokens('\n\n') * (sections - 1)
+        return total
 
     def analyze_scenarios(self, ucpl_file: Path, uuip_file: Path) -> Dict:
         """Analyze token efficiency across multiple scenarios."""
+        return self.analyze_many([ucpl_file], uuip_file)[0]
 
-        # Read files
-        ucpl_content = self.extract_ucpl_content(ucpl_file)
-        uuip_content = uuip_file.read_text(encoding='utf-8')
+    def analyze_many(self, ucpl_files: List[Path], uuip_file: Path) -> List[Dict]:
+        """Analyze several UCPL files against one UUIP interpreter."""
 
-        # Create verbose natural language version
-        verbose_natural = self.create_verbose_expansion(ucpl_content)
-
-        # Count tokens
-        ucpl_tokens = self.count_tokens(ucpl_content)
-        uuip_tokens = self.count_tokens(uuip_content)
-        verbose_tokens = self.count_tokens(verbose_natural)
+        # Read files (concurrently when there are several; reads release the GIL)
+        if len(ucpl_files) == 1:
+            ucpl_contents = [self.extract_ucpl_content(ucpl_files[0])]
+        else:
+            with ThreadPoolExecutor() as executor:
+                ucpl_contents = list(executor.map(self.extract_ucpl_content, ucpl_files))
+        uuip_content = read_text(str(uuip_file))
+
+        # Without tiktoken, counting the built text is cheap, so the estimate
+        # is only used with an encoder, and never when the text is shown
+        exact = self.exact or self.verbose or not self.encoder
+        if exact:
+            # Create verbose natural language versions
+            verbose_naturals = [self.create_verbose_expansion(content) for content in ucpl_contents]
+        else:
+            # Only the token count is needed, so skip building the text
+            verbose_naturals = []
+
+        # Count tokens for every file in one batch (the shared UUIP once)
+        counts = self.count_tokens_batch(
+            [uuip_content, *ucpl_contents, *verbose_naturals]
+        )
+        uuip_tokens = counts[0]
+        ucpl_counts = counts[1:len(ucpl_files) + 1]
+        if exact:
+            verbose_counts = counts[len(ucpl_files) + 1:]
+        else:
+            verbose_counts = [self.estimate_verbose_tokens(content) for content in ucpl_contents]
+
+        all_results = [
+            self._scenario_results(ucpl_file.name, ucpl_tokens, uuip_tokens, verbose_tokens)
+            for ucpl_file, ucpl_tokens, verbose_tokens in zip(ucpl_files, ucpl_counts, verbose_counts)
+        ]
+        for results in all_results:
+            results['verbose_tokens_estimated'] = not exact
+        if self.verbose:
+            for results, verbose_natural in zip(all_results, verbose_naturals):
+                results['verbose_expansion'] = verbose_natural
+        return all_results
+
+    @staticmethod
+    def _scenario_results(name: str, ucpl_tokens: int, uuip_tokens: int, verbose_tokens: int) -> Dict:
+        """Build the scenario comparison for one file from its token counts."""
 
         # Scenario analyses
         scenarios = {}
@@ -243,27 +510,18 @@ class ComprehensiveTokenAnalyzer:
             'total_tokens': ucpl_tokens + uuip_tokens + verbose_tokens,
         }
 
-        # Scenario 3: Reusable UCPL (5 uses)
-        reuse_count_low = 5
-        scenarios['reusable_ucpl_5x'] = {
-            'name': f'Reusable UCPL ({reuse_count_low} uses)',
-            'description': 'UCPL with UUIP loaded once, used 5 times',
-            'authoring_tokens': ucpl_tokens * reuse_count_low,
-            'processing_tokens': uuip_tokens + (verbose_tokens * reuse_count_low),
-            'total_tokens': (ucpl_tokens * reuse_count_low) + uuip_tokens + (verbose_tokens * reuse_count_low),
-            'vs_baseline': (verbose_tokens * reuse_count_low) - ((ucpl_tokens * reuse_count_low) + uuip_tokens),
-        }
-
-        # Scenario 4: Reusable UCPL (20 uses)
-        reuse_count_high = 20
-        scenarios['reusable_ucpl_20x'] = {
-            'name': f'Reusable UCPL ({reuse_count_high} uses)',
-            'description': 'UCPL with UUIP loaded once, used 20 times',
-            'authoring_tokens': ucpl_tokens * reuse_count_high,
-            'processing_tokens': uuip_tokens + (verbose_tokens * reuse_count_high),
-            'total_tokens': (ucpl_tokens * reuse_count_high) + uuip_tokens + (verbose_tokens * reuse_count_high),
-            'vs_baseline': (verbose_tokens * reuse_count_high) - ((ucpl_tokens * reuse_count_high) + uuip_tokens),
-        }
+        # Scenarios 3-4: Reusable UCPL (UUIP loaded once, used N times)
+        for reuse_count in REUSE_COUNTS:
+            authoring_tokens = ucpl_tokens * reuse_count
+            verbose_total = verbose_tokens * reuse_count
+            scenarios[f'reusable_ucpl_{reuse_count}x'] = {
+                'name': f'Reusable UCPL ({reuse_count} uses)',
+                'description': f'UCPL with UUIP loaded once, used {reuse_count} times',
+                'authoring_tokens': authoring_tokens,
+                'processing_tokens': uuip_tokens + verbose_total,
+                'total_tokens': authoring_tokens + uuip_tokens + verbose_total,
+                'vs_baseline': verbose_total - (authoring_tokens + uuip_tokens),
+            }
 
         # Scenario 5: System-level UUIP (UUIP in system prompt, not counted per-use)
         scenarios['system_uuip'] = {
@@ -275,12 +533,14 @@ class ComprehensiveTokenAnalyzer:
             'uuip_overhead': 0,  # Amortized across all sessions
         }
 
-        # Calculate compression ratios and savings
+        # Calculate compression ratios and savings (one division, hoisted:
+        # the loop only multiplies by the reciprocal)
+        baseline = scenarios['baseline_natural']['total_tokens']
+        pct_per_token = 100.0 / baseline
         for scenario_key, scenario in scenarios.items():
             if scenario_key != 'baseline_natural':
-                baseline = scenarios['baseline_natural']['total_tokens']
                 scenario['vs_baseline_tokens'] = scenario['total_tokens'] - baseline
-                scenario['vs_baseline_pct'] = (scenario['vs_baseline_tokens'] / baseline * 100)
+                scenario['vs_baseline_pct'] = scenario['vs_baseline_tokens'] * pct_per_token
 
         # Calculate break-even point
         authoring_savings = verbose_tokens - ucpl_tokens
@@ -290,7 +550,7 @@ class ComprehensiveTokenAnalyzer:
             break_even = float('inf')
 
         return {
-            'file': ucpl_file.name,
+            'file': name,
             'ucpl_tokens': ucpl_tokens,
             'verbose_tokens': verbose_tokens,
             'uuip_tokens': uuip_tokens,
@@ -303,135 +563,163 @@ class ComprehensiveTokenAnalyzer:
     def print_comprehensive_report(self, results: Dict):
         """Print comprehensive analysis report."""
 
-        print("\n" + "="*80)
-        print(f"📊 COMPREHENSIVE TOKEN EFFICIENCY ANALYSIS: {results['file']}")
-        print("="*80)
+        # Build the report in memory and write it once
+        lines = []
+        out = lines.append
 
-        print("\n📏 Token Measurements:")
-        print(f"  UCPL (compact):              {results['ucpl_tokens']:>6} tokens")
-        print(f"  Verbose natural language:    {results['verbose_tokens']:>6} tokens")
-        print(f"  UUIP interpreter:            {results['uuip_tokens']:>6} tokens")
-        print(f"  Authoring savings:           {results['authoring_savings']:>6} tokens ({results['authoring_compression_ratio']:.2f}x compression)")
+        out("\n" + "="*80)
+        out(f"📊 COMPREHENSIVE TOKEN EFFICIENCY ANALYSIS: {results['file']}")
+        out("="*80)
 
-        print(f"\n⚖️  Break-even Analysis:")
-        print(f"  UCPL breaks even after:      {results['break_even_uses']:>6.1f} uses")
+        out("\n📏 Token Measurements:")
+        out(f"  UCPL (compact):              {results['ucpl_tokens']:>6} tokens")
+        if results.get('verbose_tokens_estimated'):
+            estimate = f"≈{results['verbose_tokens']}"
+            out(f"  Verbose natural language:    {estimate:>6} tokens (estimated)")
+        else:
+            out(f"  Verbose natural language:    {results['verbose_tokens']:>6} tokens")
+        out(f"  UUIP interpreter:            {results['uuip_tokens']:>6} tokens")
+        out(f"  Authoring savings:           {results['authoring_savings']:>6} tokens ({results['authoring_compression_ratio']:.2f}x compression)")
+
+        if 'verbose_expansion' in results:
+            out("\n📝 Verbose Expansion:")
+            out(results['verbose_expansion'])
+
+        out(f"\n⚖️  Break-even Analysis:")
+        out(f"  UCPL breaks even after:      {results['break_even_uses']:>6.1f} uses")
 
-        print("\n" + "-"*80)
-        print("SCENARIO COMPARISON")
-        print("-"*80)
+        out("\n" + "-"*80)
+        out("SCENARIO COMPARISON")
+        out("-"*80)
 
         baseline_tokens = results['scenarios']['baseline_natural']['total_tokens']
 
         for key, scenario in results['scenarios'].items():
-            print(f"\n{scenario['name']}")
-            print(f"  {scenario['description']}")
-            print(f"  Authoring:   {scenario['authoring_tokens']:>6} tokens")
-            print(f"  Processing:  {scenario['processing_tokens']:>6} tokens")
-            print(f"  Total:       {scenario['total_tokens']:>6} tokens", end="")
+            out(f"\n{scenario['name']}")
+            out(f"  {scenario['description']}")
+            out(f"  Authoring:   {scenario['authoring_tokens']:>6} tokens")
+            out(f"  Processing:  {scenario['processing_tokens']:>6} tokens")
+            total = f"  Total:       {scenario['total_tokens']:>6} tokens"
 
             if key != 'baseline_natural':
-                diff = scenario['total_tokens'] - baseline_tokens
-                pct = (diff / baseline_tokens * 100)
+                diff = scenario['vs_baseline_tokens']
+                pct = scenario['vs_baseline_pct']
                 symbol = "💰" if diff < 0 else "⚠️"
-                print(f"  {symbol} {diff:>+6} tokens ({pct:>+6.1f}%)")
+                out(f"{total}  {symbol} {diff:>+6} tokens ({pct:>+6.1f}%)")
             else:
-                print("  (baseline)")
+                out(f"{total}  (baseline)")
 
-        print("\n" + "="*80)
-        print("📋 VERDICT")
-        print("="*80)
+        out("\n" + "="*80)
+        out("📋 VERDICT")
+        out("="*80)
 
         compression = results['authoring_compression_ratio']
-        print(f"\n✅ Authoring Efficiency:")
-        print(f"   UCPL is {compression:.2f}x more compact than natural language")
-        print(f"   Saves {results['authoring_savings']} tokens per prompt ({results['authoring_savings'] / results['verbose_tokens'] * 100:.1f}%)")
+        out(f"\n✅ Authoring Efficiency:")
+        out(f"   UCPL is {compression:.2f}x more compact than natural language")
+        out(f"   Saves {results['authoring_savings']} tokens per prompt ({results['authoring_savings'] / results['verbose_tokens'] * 100:.1f}%)")
 
-        print(f"\n💾 Processing Cost:")
+        out(f"\n💾 Processing Cost:")
         if results['break_even_uses'] <= 1:
-            print(f"   ✅ NET SAVINGS even for one-off use")
+            out(f"   ✅ NET SAVINGS even for one-off use")
         elif results['break_even_uses'] <= 5:
-            print(f"   ✅ LOW OVERHEAD: breaks even after {int(results['break_even_uses'])} uses")
+            out(f"   ✅ LOW OVERHEAD: breaks even after {int(results['break_even_uses'])} uses")
         elif results['break_even_uses'] <= 20:
-            print(f"   ⚠️  MODERATE OVERHEAD: breaks even after {int(results['break_even_uses'])} uses")
+            out(f"   ⚠️  MODERATE OVERHEAD: breaks even after {int(results['break_even_uses'])} uses")
         else:
-            print(f"   ❌ HIGH OVERHEAD: needs {int(results['break_even_uses'])} uses to break even")
+            out(f"   ❌ HIGH OVERHEAD: needs {int(results['break_even_uses'])} uses to break even")
 
-        print(f"\n💡 Recommendations:")
+        out(f"\n💡 Recommendations:")
 
         # System-level scenario
         system_scenario = results['scenarios']['system_uuip']
         if system_scenario['total_tokens'] < baseline_tokens:
             savings_pct = abs(system_scenario['vs_baseline_pct'])
-            print(f"   ✅ With system-level UUIP (like CLAUDE.md): {savings_pct:.1f}% token savings")
+            out(f"   ✅ With system-level UUIP (like CLAUDE.md): {savings_pct:.1f}% token savings")
 
         # Reusable scenario
         reuse_scenario = results['scenarios']['reusable_ucpl_20x']
         if reuse_scenario['total_tokens'] < results['scenarios']['baseline_natural']['total_tokens'] * 20:
-            print(f"   ✅ For reusable prompts: significant savings at scale")
+            out(f"   ✅ For reusable prompts: significant savings at scale")
 
-        print("\n🎯 Overall Assessment:")
+        out("\n🎯 Overall Assessment:")
         if compression >= 2.0:
-            print("   UCPL provides EXCELLENT authoring efficiency (2x+ compression)")
+            out("   UCPL provides EXCELLENT authoring efficiency (2x+ compression)")
         elif compression >= 1.5:
-            print("   UCPL provides GOOD authoring efficiency (1.5-2x compression)")
+            out("   UCPL provides GOOD authoring efficiency (1.5-2x compression)")
         else:
-            print("   UCPL provides MODEST authoring efficiency (<1.5x compression)")
+            out("   UCPL provides MODEST authoring efficiency (<1.5x compression)")
 
         # Final claim validation
-        print("\n" + "="*80)
-        print("🔍 CLAIM VALIDATION: 'UCPL usage means spending less tokens'")
-        print("="*80)
+        out("\n" + "="*80)
+        out("🔍 CLAIM VALIDATION: 'UCPL usage means spending less tokens'")
+        out("="*80)
 
         system_saves = system_scenario['total_tokens'] < baseline_tokens
         reuse_saves = results['scenarios']['reusable_ucpl_5x']['vs_baseline'] > 0
 
         if system_saves and reuse_saves:
-            print("\n✅ CLAIM VALIDATED:")
-            print("   YES - UCPL saves tokens in most practical scenarios:")
-            print("   • With system-level UUIP (recommended setup)")
-            print("   • For reusable prompts (>5 uses)")
-            print("   • Significant authoring time savings in all cases")
+            out("\n✅ CLAIM VALIDATED:")
+            out("   YES - UCPL saves tokens in most practical scenarios:")
+            out("   • With system-level UUIP (recommended setup)")
+            out("   • For reusable prompts (>5 uses)")
+            out("   • Significant authoring time savings in all cases")
         elif system_saves:
-            print("\n⚠️  CLAIM PARTIALLY VALIDATED:")
-            print("   YES for system-level UUIP (like CLAUDE.md)")
-            print("   NO for one-off inline UUIP usage")
-            print("   RECOMMENDATION: Use UCPL with system-level interpreter")
+            out("\n⚠️  CLAIM PARTIALLY VALIDATED:")
+            out("   YES for system-level UUIP (like CLAUDE.md)")
+            out("   NO for one-off inline UUIP usage")
+            out("   RECOMMENDATION: Use UCPL with system-level interpreter")
         else:
-            print("\n❌ CLAIM NOT VALIDATED:")
-            print("   Current implementation has high UUIP overhead")
-            print("   Consider optimizing UUIP or using for complex prompts only")
+            out("\n❌ CLAIM NOT VALIDATED:")
+            out("   Current implementation has high UUIP overhead")
+            out("   Consider optimizing UUIP or using for complex prompts only")
 
-        print("\n")
+        out("\n")
+
+        sys.stdout.write('\n'.join(lines) + '\n')
 
 
 def main():
     """Main entry point."""
 
-    if len(sys.argv) < 2:
-        print("Usage: python comprehensive_token_analysis.py <ucpl_file> [uuip_file]")
+    options = {"--verbose", "--exact"}
+    args = [arg for arg in sys.argv[1:] if arg not in options]
+    verbose = "--verbose" in sys.argv[1:]
+    exact = "--exact" in sys.argv[1:]
+
+    if not args:
+        print("Usage: python comprehensive_token_analysis.py <ucpl_file|glob> [uuip_file] [--verbose] [--exact]")
         print("\nPerforms comprehensive token efficiency analysis across multiple scenarios.")
+        print("Quote glob patterns (e.g. 'examples/*.ucpl') to analyze many files at once.")
+        print("\nOptions:")
+        print("  --verbose  Print the full verbose expansion in the report (counted exactly)")
+        print("  --exact    Build the full verbose expansion and count it exactly")
+        print("             (default: estimate its token count from per-template counts)")
         sys.exit(1)
 
-    ucpl_file = Path(sys.argv[1])
+    pattern = args[0]
 
-    if len(sys.argv) > 2:
-        uuip_file = Path(sys.argv[2])
+    if len(args) > 1:
+        uuip_file = Path(args[1])
     else:
         uuip_file = Path("CLAUDE.md")
         if not uuip_file.exists():
             uuip_file = Path("../CLAUDE.md")
 
-    if not ucpl_file.exists():
-        print(f"Error: UCPL file not found: {ucpl_file}")
+    ucpl_files = expand_paths(pattern)
+    if not ucpl_files:
+        print(f"Error: No UCPL files match: {pattern}")
+        sys.exit(1)
+    if not ucpl_files[0].exists():
+        print(f"Error: UCPL file not found: {ucpl_files[0]}")
         sys.exit(1)
 
     if not uuip_file.exists():
         print(f"Error: UUIP file not found: {uuip_file}")
         sys.exit(1)
 
-    analyzer = ComprehensiveTokenAnalyzer()
-    results = analyzer.analyze_scenarios(ucpl_file, uuip_file)
-    analyzer.print_comprehensive_report(results)
+    analyzer = ComprehensiveTokenAnalyzer(verbose=verbose, exact=exact)
+    for results in analyzer.analyze_many(ucpl_files, uuip_file):
+        analyzer.print_comprehensive_report(results)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+"""
+Shared Token Counting for the UCPL Analysis Scripts
+
+Counts tokens with tiktoken's GPT-4 encoding when it is installed.
+Without tiktoken, falls back to a greedy pre-tokenization estimate:
+every run of word characters and every punctuation character counts
+as one token, which tracks BPE counts far more closely than 4 chars/token.
+There is deliberately no shipped table of exact counts for the repo's own
+files: it would go stale whenever the examples, CLAUDE.md or the verbose
+expansion templates change.
+
+Also holds the input reader and command-line path expansion the scripts
+(and validate_ucpl.py) share, so every script reads the same text for a
+given file.
+"""
+
+import os
+import re
+import glob
+import mmap
+import stat
+import functools
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+# Greedy word/punctuation splitter used when tiktoken is unavailable
+_ESTIMATE_RE = re.compile(r"\w+|[^\w\s]")
+
+# Batches smaller than this are encoded text by text: tiktoken starts and
+# shuts down a thread pool on every batch call
+MIN_BATCH_SIZE = 4
+
+# Input files at least this large are read through mmap
+MMAP_THRESHOLD = 1 << 20
+
+# Bytes requested per os.read once a file's reported size has been read
+READ_CHUNK_SIZE = 1 << 16
+
+
+@functools.lru_cache(maxsize=32)
+def read_text(path_str: str) -> str:
+    """
+    Read a UTF-8 file once per process (the UUIP file is shared by every
+    analysis), with raw os.read calls and one decode instead of the buffered
+    TextIOWrapper. Regular files of MMAP_THRESHOLD bytes or more are decoded
+    straight from a read-only mmap, so no intermediate bytes copy of the
+    whole file is made. Pipes and other non-regular inputs report no usable
+    size and are read until EOF. Newlines are normalized like
+    Path.read_text does.
+    """
+    fd = os.open(path_str, os.O_RDONLY)
+    try:
+        st = os.fstat(fd)
+        regular = stat.S_ISREG(st.st_mode)
+        if regular and hasattr(os, 'posix_fadvise'):
+            # Only a hint: pipes and FIFOs reject it with ESPIPE
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                pass
+        if regular and st.st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapped:
+                text = str(mapped, 'utf-8')
+        else:
+            text = _read_to_eof(fd, st.st_size if regular else 0).decode('utf-8')
+    finally:
+        os.close(fd)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _read_to_eof(fd: int, size_hint: int) -> bytes:
+    """Read fd until EOF, asking for size_hint bytes first (os.read may return fewer)."""
+    chunks = []
+    want = max(size_hint, READ_CHUNK_SIZE)
+    while True:
+        chunk = os.read(fd, want)
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+        want = READ_CHUNK_SIZE
+
+
+def expand_paths(pattern: str) -> List[Path]:
+    """
+    Resolve a command-line file argument: an existing path is used as-is
+    (even if its name contains glob characters such as '['), anything else
+    with '*', '?' or '[' is expanded as a recursive glob. Returns an empty
+    list when a glob matches nothing.
+    """
+    path = Path(pattern)
+    if path.exists() or not any(char in pattern for char in '*?['):
+        return [path]
+    return sorted(Path(match) for match in glob.glob(pattern, recursive=True))
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoder(model: str = "gpt-4"):
+    """Load the tiktoken encoding for a model once per process (None without tiktoken)."""
+    if not HAS_TIKTOKEN:
+        return None
+    return tiktoken.encoding_for_model(model)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text without a tokenizer."""
+    return len(_ESTIMATE_RE.findall(text))
+
+
+@functools.lru_cache(maxsize=4096)
+def count_tokens(text: str, encoder=None) -> int:
+    """Count tokens in text using encoder, or estimate them if encoder is None."""
+    if encoder is not None:
+        return len(encoder.encode_ordinary(text))
+    return estimate_tokens(text)
+
+
+def count_tokens_batch(texts: List[str], encoder=None, num_threads: Optional[int] = None) -> List[int]:
+    """
+    Count tokens for several texts with a single tokenizer call, on
+    num_threads tokenizer threads (default: one per core).
+    """
+    if encoder is not None:
+        if len(texts) < MIN_BATCH_SIZE:
+            return [len(encoder.encode_ordinary(text)) for text in texts]
+        # tiktoken shards batches across its own thread pool
+        batch = encoder.encode_ordinary_batch(texts, num_threads=num_threads or os.cpu_count() or 1)
+        return [len(tokens) for tokens in batch]
+    return [estimate_tokens(text) for text in texts]
@@ -0,0 +1,56 @@
+"""
+Shared UCPL Document Loading for the UCPL Scripts
+
+Splits a UCPL source into its YAML frontmatter and body and parses the
+frontmatter once, so the validator and the schema converter can run over
+the same document without loading its YAML twice.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+import yaml
+
+try:
+    # libyaml's C loader parses frontmatter far faster than the pure-Python one
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:
+    from yaml import SafeLoader as _YAMLLoader
+
+_RE_YAML_DELIM = re.compile(r'^---\s*$', re.MULTILINE)
+
+
+def split_frontmatter(content: str) -> Tuple[Optional[str], str]:
+    """Split content at its first two '---' lines into (header, body).
+
+    Returns (None, content) when there is no complete frontmatter block.
+    """
+    delimiters = _RE_YAML_DELIM.finditer(content)
+    first = next(delimiters, None)
+    second = next(delimiters, None)
+    if second is None:
+        return None, content
+    return content[first.end():second.start()], content[second.end():]
+
+
+@dataclass
+class UCPLDocument:
+    """UCPL source text with its frontmatter split off and parsed."""
+
+    content: str
+    header_text: Optional[str]
+    body: str
+    header: Any = None
+    yaml_error: Optional[yaml.YAMLError] = None
+
+    @classmethod
+    def from_text(cls, content: str) -> "UCPLDocument":
+        """Split content and parse its YAML header (header is None if absent or invalid)."""
+        header_text, body = split_frontmatter(content)
+        doc = cls(content, header_text, body)
+        if header_text is not None:
+            try:
+                doc.header = yaml.load(header_text.strip(), Loader=_YAMLLoader)
+            except yaml.YAMLError as e:
+                doc.yaml_error = e
+        return doc
@@ -12,8 +12,31 @@ import json
 import re
 import sys
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-import yaml
+from typing import Dict, Any, Optional
+
+from token_count import count_tokens, get_encoder, read_text
+from ucpl_document import UCPLDocument, split_frontmatter
+
+
+_RE_HTML_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+_RE_MACRO_DEF = re.compile(r'@def\s+(\w+):')
+_RE_IF = re.compile(r'@if\s+(.+?):\s*(.+)')
+_RE_FOR = re.compile(r'@for\s+(\$\w+)\s+in\s+(\$\w+):')
+_RE_TOOL = re.compile(r'@@(\w+):(\w+)(?:\[(.+?)\])?')
+# Parser states for _parse_ucpl_content
+_TOP, _IN_MACRO, _IN_WORKFLOW = 'top', 'macro', 'workflow'
+# First characters of the lines _parse_ucpl_content acts on
+_LINE_PREFIXES = ('@', '!', '?', '~')
+# Directive keyword up to and including its ':' or ' ' delimiter
+_RE_DIRECTIVE_KEY = re.compile(r'@([^: ]*[: ])')
+# Same output as json.dumps(obj), minus the per-call encoder setup
+_COMPACT_ENCODER = json.JSONEncoder()
+
+
+def _store_var(text: str) -> Optional[str]:
+    """Return the variable after the first '> $' (up to any second one), or None."""
+    _, sep, var = text.partition('> $')
+    return var.partition('> $')[0] if sep else None
 
 
 class UCPLSchemaConverter:
@@ -30,21 +53,28 @@ class UCPLSchemaConverter:
             "macros": {},
             "output": {},
         }
-        self.current_macro = None
-        self.in_workflow = False
         self.workflow_steps = []
+        self._state = _TOP
+        self._workflow_open = False
+        self._macro = None
+        self._add_macro_constraint = {}
 
     def parse_file(self, file_path: Path) -> Dict:
         """Parse UCPL file into structured schema."""
-        content = file_path.read_text(encoding='utf-8')
+        return self.parse_content(read_text(str(file_path)))
+
+    def parse_content(self, content: str) -> Dict:
+        """Parse UCPL source text into structured schema."""
+        return self.parse_document(UCPLDocument.from_text(content))
 
-        # Extract YAML header
-        header = self._extract_yaml_header(content)
-        if header:
-            self.schema["meta"].update(header)
+    def parse_document(self, doc: UCPLDocument) -> Dict:
+        """Parse an already-split UCPL document into structured schema."""
+        # YAML header (None when missing or invalid)
+        if doc.header:
+            self.schema["meta"].update(doc.header)
 
         # Extract UCPL content
-        ucpl_content = self._extract_ucpl_content(content)
+        ucpl_content = self._extract_ucpl_content(doc.content, doc.body)
 
         # Parse UCPL line by line
         self._parse_ucpl_content(ucpl_content)
@@ -54,287 +84,233 @@ class UCPLSchemaConverter:
 
         return self.schema
 
-    def _extract_yaml_header(self, content: str) -> Optional[Dict]:
-        """Extract YAML frontmatter."""
-        matches = list(re.finditer(r'^---\s*$', content, re.MULTILINE))
-        if len(matches) >= 2:
-            yaml_content = content[matches[0].end():matches[1].start()].strip()
-            try:
-                return yaml.safe_load(yaml_content)
-            except yaml.YAMLError:
-                return None
-        return None
-
-    def _extract_ucpl_content(self, content: str) -> str:
+    def _extract_ucpl_content(self, content: str, body: str) -> str:
         """Extract UCPL content after YAML header."""
-        content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
-        matches = list(re.finditer(r'^---\s*$', content, re.MULTILINE))
-        if len(matches) >= 2:
-            return content[matches[1].end():].strip()
-        return content.strip()
+        if '<!--' in content:
+            # Comments can hide or contain delimiters, so split again without them
+            _, body = split_frontmatter(_RE_HTML_COMMENT.sub('', content))
+        return body.strip()
 
     def _parse_ucpl_content(self, content: str):
-        """Parse UCPL content line by line."""
-        lines = content.split('\n')
-        i = 0
+        """Parse UCPL content in a single pass over its lines.
+
+        Macro bodies and workflow steps are states of this loop rather
+        than nested scans, so every line is visited exactly once.
+        """
+        constraints = self.schema["constraints"]
+        add_constraint = {
+            '!': constraints["must"].append,
+            '?': constraints["optional"].append,
+            '~': constraints["avoid"].append,
+        }
+        self._state = _TOP
 
-        while i < len(lines):
-            line = lines[i].strip()
+        for raw in content.split('\n'):
+            line = raw.strip()
 
-            # Skip empty lines and comments
-            if not line or line.startswith('#'):
-                i += 1
+            # Skip empty lines (they never end a macro or workflow)
+            if not line:
+                continue
+
+            # Inside a macro or workflow: indented and @ lines belong to it,
+            # any other line ends it and is then parsed at top level
+            if self._state != _TOP:
+                if line[0] == '@' or raw.startswith('  '):
+                    if self._state == _IN_MACRO:
+                        self._parse_macro_line(line)
+                    else:
+                        self._parse_workflow_line(line)
+                    continue
+                self._end_block()
+
+            # Skip comments and plain text (including '> $' assignments)
+            if not line.startswith(_LINE_PREFIXES):
                 continue
 
             # Parse directives
-            if line.startswith('@'):
-                i = self._parse_directive(lines, i)
+            if line[0] == '@':
+                self._parse_directive(line)
 
             # Parse constraints
-            elif line.startswith('!'):
-                self.schema["constraints"]["must"].append(line[1:])
-                i += 1
-
-            elif line.startswith('?'):
-                self.schema["constraints"]["optional"].append(line[1:])
-                i += 1
+            else:
+                add_constraint[line[0]](line[1:])
 
-            elif line.startswith('~'):
-                self.schema["constraints"]["avoid"].append(line[1:])
-                i += 1
+        if self._state != _TOP:
+            self._end_block()
 
-            # Parse variable assignment
-            elif '> $' in line:
-                # Handle output to variable
-                i += 1
+    def _end_block(self):
+        """Close the open macro or workflow, storing the workflow if one was open."""
+        if self._state == _IN_MACRO:
+            self._macro = None
 
-            else:
-                i += 1
-
-    def _parse_directive(self, lines: List[str], index: int) -> int:
-        """Parse directive and return next line index."""
-        line = lines[index].strip()
-
-        # Role directive
-        if line.startswith('@role:'):
-            self.schema["context"]["role"] = line.split(':', 1)[1].strip()
-            return index + 1
-
-        # Task directive
-        elif line.startswith('@task:'):
-            task_spec = line.split(':', 1)[1].strip()
-            if '|' in task_spec:
-                parts = task_spec.split('|')
-                self.schema["task"]["primary"] = parts[0]
-                self.schema["task"]["focus"] = parts[1:]
-            else:
-                self.schema["task"]["primary"] = task_spec
-            return index + 1
-
-        # Scope directive
-        elif line.startswith('@scope:'):
-            self.schema["task"]["scope"] = line.split(':', 1)[1].strip()
-            return index + 1
-
-        # Principles directive
-        elif line.startswith('@principles:'):
-            principles = line.split(':', 1)[1].strip()
-            self.schema["context"]["principles"] = principles.split('+')
-            return index + 1
-
-        # Output directive
-        elif line.startswith('@out:'):
-            output_spec = line.split(':', 1)[1].strip()
-            self.schema["output"]["format"] = output_spec.split('+')
-            return index + 1
-
-        # Macro definition
-        elif line.startswith('@def '):
-            return self._parse_macro_definition(lines, index)
-
-        # Macro usage
-        elif line.startswith('@use '):
-            macro_name = line.split()[1]
-            if '>' in line:
-                var = line.split('> $')[1] if '> $' in line else None
-                self.workflow_steps.append({
-                    "action": "call_macro",
-                    "macro": macro_name,
-                    "store": f"${var}" if var else None
-                })
-            return index + 1
-
-        # Workflow
-        elif line.startswith('@workflow:'):
-            self.in_workflow = True
-            return self._parse_workflow(lines, index + 1)
-
-        # Chain (within workflow)
-        elif line.startswith('@chain:'):
-            return index + 1  # Continue parsing steps
-
-        # Conditional
-        elif line.startswith('@if '):
-            return self._parse_conditional(lines, index)
-
-        # Loop
-        elif line.startswith('@loop:'):
-            return self._parse_loop(lines, index)
-
-        # Until
-        elif line.startswith('@until '):
-            condition = line.split('@until ')[1].strip()
+        # A macro defined inside a workflow ends that workflow with it
+        if self._workflow_open:
+            self._workflow_open = False
             if self.workflow_steps:
-                self.workflow_steps[-1]["until"] = condition
-            return index + 1
+                self.schema["workflow"] = {
+                    "type": "sequential",
+                    "steps": self.workflow_steps
+                }
 
-        # For loop
-        elif line.startswith('@for '):
-            return self._parse_for_loop(lines, index)
+        self._state = _TOP
 
+    def _parse_directive(self, line: str):
+        """Parse a directive line."""
         # Tool invocation
-        elif line.startswith('@@'):
+        if line.startswith('@@'):
             tool_spec = self._parse_tool_invocation(line)
             self.workflow_steps.append(tool_spec)
-            return index + 1
-
-        return index + 1
+            return
+
+        key = _RE_DIRECTIVE_KEY.match(line)
+        handler = self._DIRECTIVE_HANDLERS.get(key.group(1)) if key else None
+        if handler:
+            handler(self, line)
+
+        # Chain (within workflow) and unknown directives are ignored
+
+    def _parse_role(self, line: str):
+        """Parse role directive."""
+        self.schema["context"]["role"] = line.partition(':')[2].strip()
+
+    def _parse_task(self, line: str):
+        """Parse task directive."""
+        task_spec = line.partition(':')[2].strip()
+        if '|' in task_spec:
+            parts = task_spec.split('|')
+            self.schema["task"]["primary"] = parts[0]
+            self.schema["task"]["focus"] = parts[1:]
+        else:
+            self.schema["task"]["primary"] = task_spec
+
+    def _parse_scope(self, line: str):
+        """Parse scope directive."""
+        self.schema["task"]["scope"] = line.partition(':')[2].strip()
+
+    def _parse_principles(self, line: str):
+        """Parse principles directive."""
+        principles = line.partition(':')[2].strip()
+        self.schema["context"]["principles"] = principles.split('+')
+
+    def _parse_output(self, line: str):
+        """Parse output directive."""
+        output_spec = line.partition(':')[2].strip()
+        self.schema["output"]["format"] = output_spec.split('+')
+
+    def _parse_macro_usage(self, line: str):
+        """Parse macro usage."""
+        macro_name = line.split(None, 2)[1]
+        if '>' in line:
+            var = _store_var(line)
+            self.workflow_steps.append({
+                "action": "call_macro",
+                "macro": macro_name,
+                "store": f"${var}" if var else None
+            })
+
+    def _parse_workflow_directive(self, line: str):
+        """Start a workflow section; its steps follow on indented lines."""
+        self._workflow_open = True
+        self._state = _IN_WORKFLOW
+
+    def _parse_until(self, line: str):
+        """Parse until condition for the previous step."""
+        condition = line[len('@until '):].partition('@until ')[0].strip()
+        if self.workflow_steps:
+            self.workflow_steps[-1]["until"] = condition
 
-    def _parse_macro_definition(self, lines: List[str], index: int) -> int:
-        """Parse macro definition."""
-        line = lines[index].strip()
-        macro_match = re.match(r'@def\s+(\w+):', line)
+    def _parse_macro_definition(self, line: str):
+        """Start a macro definition; its body follows on indented or @ lines."""
+        macro_match = _RE_MACRO_DEF.match(line)
         if not macro_match:
-            return index + 1
+            return
 
         macro_name = macro_match.group(1)
-        self.current_macro = macro_name
-        self.schema["macros"][macro_name] = {
+        self._macro = self.schema["macros"][macro_name] = {
             "steps": [],
             "context": {},
             "constraints": {"must": [], "optional": [], "avoid": []}
         }
+        constraints = self._macro["constraints"]
+        self._add_macro_constraint = {
+            '!': constraints["must"].append,
+            '?': constraints["optional"].append,
+            '~': constraints["avoid"].append,
+        }
+        self._state = _IN_MACRO
 
-        # Parse macro body (indented lines)
-        i = index + 1
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line:
-                i += 1
-                continue
-
-            # Check if we're still in macro (indented or starts with @)
-            if not lines[i].startswith('  ') and not line.startswith('@') and line:
-                # Exiting macro
-                break
-
-            # Parse macro content
+    def _parse_macro_line(self, line: str):
+        """Parse one line of the current macro body."""
+        macro = self._macro
+        first = line[0]
+        if first == '@':
             if line.startswith('@task:'):
-                task = line.split(':', 1)[1].strip()
+                task = line.partition(':')[2].strip()
                 if '|' in task:
                     parts = task.split('|')
-                    self.schema["macros"][macro_name]["context"]["task"] = parts[0]
-                    self.schema["macros"][macro_name]["context"]["focus"] = parts[1:]
+                    macro["context"]["task"] = parts[0]
+                    macro["context"]["focus"] = parts[1:]
                 else:
-                    self.schema["macros"][macro_name]["context"]["task"] = task
-
-            elif line.startswith('!'):
-                self.schema["macros"][macro_name]["constraints"]["must"].append(line[1:])
-
-            elif line.startswith('?'):
-                self.schema["macros"][macro_name]["constraints"]["optional"].append(line[1:])
-
-            elif line.startswith('~'):
-                self.schema["macros"][macro_name]["constraints"]["avoid"].append(line[1:])
-
-            elif line.startswith('@'):
-                # Other directives in macro
-                if line.startswith('@out:'):
-                    self.schema["macros"][macro_name]["output"] = line.split(':', 1)[1].strip().split('+')
-
-            i += 1
-
-        self.current_macro = None
-        return i
-
-    def _parse_workflow(self, lines: List[str], index: int) -> int:
-        """Parse workflow section."""
-        i = index
-
-        while i < len(lines):
-            line = lines[i].strip()
-
-            if not line:
-                i += 1
-                continue
-
-            # Check for workflow end (unindented non-@ line)
-            if not lines[i].startswith('  ') and not line.startswith('@'):
-                break
-
-            # Parse numbered steps
-            step_match = re.match(r'(\d+)\.(.+)', line)
-            if step_match:
-                step_num = int(step_match.group(1))
-                step_content = step_match.group(2).strip()
-
-                step_obj = {"step": step_num}
-
-                # Parse step content
-                if step_content.startswith('@use '):
-                    macro = step_content.split()[1]
-                    step_obj["action"] = "call_macro"
-                    step_obj["macro"] = macro
-
-                    if '> $' in step_content:
-                        var = step_content.split('> $')[1].strip()
-                        step_obj["store"] = f"${var}"
-
-                elif step_content.startswith('@task:'):
-                    task = step_content.split(':', 1)[1].strip()
-                    step_obj["action"] = task
-
-                    if '> $' in step_content:
-                        var = step_content.split('> $')[1].strip()
-                        step_obj["store"] = f"${var}"
-
-                elif step_content.startswith('@if '):
-                    # Conditional step
-                    condition_match = re.match(r'@if\s+(.+?):\s*(.+)', step_content)
-                    if condition_match:
-                        condition = condition_match.group(1).strip()
-                        action = condition_match.group(2).strip()
-                        step_obj["condition"] = {"if": condition}
-                        step_obj["action"] = action
-
-                elif step_content.startswith('@loop:'):
-                    step_obj["action"] = "loop"
-                    step_obj["loop"] = {}
-
+                    macro["context"]["task"] = task
+
+            # Other directives in macro
+            elif line.startswith('@out:'):
+                macro["output"] = line.partition(':')[2].strip().split('+')
+
+        elif first in self._add_macro_constraint:
+            self._add_macro_constraint[first](line[1:])
+
+    def _parse_workflow_line(self, line: str):
+        """Parse one line of the current workflow section."""
+        # Parse numbered steps ("N.content"); a plain scan beats a regex here
+        digits = 0
+        while digits < len(line) and line[digits].isdecimal():
+            digits += 1
+        if digits and digits + 1 < len(line) and line[digits] == '.':
+            step_num = int(line[:digits])
+            step_content = line[digits + 1:].strip()
+
+            # Parse step content, building each step dict in one literal
+            if step_content.startswith('@use '):
+                macro = step_content.split(None, 2)[1]
+                step_obj = {"step": step_num, "action": "call_macro", "macro": macro}
+
+                var = _store_var(step_content)
+                if var is not None:
+                    step_obj["store"] = f"${var.strip()}"
+
+            elif step_content.startswith('@task:'):
+                task = step_content.partition(':')[2].strip()
+                step_obj = {"step": step_num, "action": task}
+
+                var = _store_var(step_content)
+                if var is not None:
+                    step_obj["store"] = f"${var.strip()}"
+
+            elif step_content.startswith('@if '):
+                # Conditional step
+                condition_match = _RE_IF.match(step_content)
+                if condition_match:
+                    condition = condition_match.group(1).strip()
+                    action = condition_match.group(2).strip()
+                    step_obj = {"step": step_num, "condition": {"if": condition}, "action": action}
                 else:
-                    step_obj["action"] = step_content
-
-                self.workflow_steps.append(step_obj)
+                    step_obj = {"step": step_num}
 
-            elif line.startswith('@'):
-                i = self._parse_directive(lines, i)
-                continue
+            elif step_content.startswith('@loop:'):
+                step_obj = {"step": step_num, "action": "loop", "loop": {}}
 
-            i += 1
+            else:
+                step_obj = {"step": step_num, "action": step_content}
 
-        # Store workflow
-        if self.workflow_steps:
-            self.schema["workflow"] = {
-                "type": "sequential",
-                "steps": self.workflow_steps
-            }
+            self.workflow_steps.append(step_obj)
 
-        return i
+        elif line[0] == '@':
+            self._parse_directive(line)
 
-    def _parse_conditional(self, lines: List[str], index: int) -> int:
+    def _parse_conditional(self, line: str):
         """Parse conditional statement."""
-        line = lines[index].strip()
-        condition_match = re.match(r'@if\s+(.+?):\s*(.+)', line)
+        condition_match = _RE_IF.match(line)
 
         if condition_match:
             condition = condition_match.group(1).strip()
@@ -346,21 +322,17 @@ class UCPLSchemaConverter:
             }
             self.workflow_steps.append(step)
 
-        return index + 1
-
-    def _parse_loop(self, lines: List[str], index: int) -> int:
+    def _parse_loop(self, line: str):
         """Parse loop statement."""
         loop_step = {
             "action": "loop",
             "loop": {"steps": []}
         }
         self.workflow_steps.append(loop_step)
-        return index + 1
 
-    def _parse_for_loop(self, lines: List[str], index: int) -> int:
+    def _parse_for_loop(self, line: str):
         """Parse for loop."""
-        line = lines[index].strip()
-        for_match = re.match(r'@for\s+(\$\w+)\s+in\s+(\$\w+):', line)
+        for_match = _RE_FOR.match(line)
 
         if for_match:
             loop_var = for_match.group(1)
@@ -374,11 +346,25 @@ class UCPLSchemaConverter:
             }
             self.workflow_steps.append(loop_step)
 
-        return index + 1
+    # Directive keyword (with its ':' or ' ' delimiter) -> handler, built once
+    _DIRECTIVE_HANDLERS = {
+        'role:': _parse_role,
+        'task:': _parse_task,
+        'scope:': _parse_scope,
+        'principles:': _parse_principles,
+        'out:': _parse_output,
+        'def ': _parse_macro_definition,
+        'use ': _parse_macro_usage,
+        'workflow:': _parse_workflow_directive,
+        'if ': _parse_conditional,
+        'loop:': _parse_loop,
+        'until ': _parse_until,
+        'for ': _parse_for_loop,
+    }
 
     def _parse_tool_invocation(self, line: str) -> Dict:
         """Parse tool invocation (@@)."""
-        tool_match = re.match(r'@@(\w+):(\w+)(?:\[(.+?)\])?', line)
+        tool_match = _RE_TOOL.match(line)
 
         if tool_match:
             category = tool_match.group(1)
@@ -397,8 +383,8 @@ class UCPLSchemaConverter:
             if params_str:
                 params = {}
                 for param in params_str.split(','):
-                    if '=' in param:
-                        key, value = param.split('=', 1)
+                    key, sep, value = param.partition('=')
+                    if sep:
                         params[key.strip()] = value.strip()
                 tool_spec["tool"]["parameters"] = params
 
@@ -426,8 +412,14 @@ class UCPLSchemaConverter:
 
     def estimate_tokens(self) -> int:
         """Estimate token count of JSON schema."""
-        json_str = self.to_json(indent=None)  # Compact form
-        # Approximate: 1 token ≈ 4 characters
+        json_str = _COMPACT_ENCODER.encode(self.schema)  # Compact form
+        encoder = get_encoder()
+        if encoder is not None:
+            # Exact count with the analysis scripts' tokenizer
+            return count_tokens(json_str, encoder)
+        # Approximate: 1 token ≈ 4 characters. token_count's word/punctuation
+        # estimate counts every JSON quote, brace and colon on its own, which
+        # has not been checked against real counts for schema JSON.
         return len(json_str) // 4
 
 
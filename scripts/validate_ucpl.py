@@ -6,12 +6,35 @@ Validates that UCPL files are self-describing and can be interpreted by any LLM.
 Checks for required headers, version compatibility, and proper formatting.
 """
 
+import os
 import sys
-import yaml
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 import re
 
+from token_count import read_text
+from ucpl_document import UCPLDocument
+
+
+_RE_UUIP_COMMENT = re.compile(r'<!--\s*UCPL:\s*Expand with UUIP\s+v[\d.]+.*?-->')
+
+# Common UCPL patterns
+_UCPL_PATTERNS = (
+    re.compile(r'@\w+:'),  # Directives
+    re.compile(r'!\w+'),   # Constraints
+    re.compile(r'>\s*\w+'), # Output operators
+)
+
+# The directory scan looks for this marker in a file's first 500 characters.
+# Those take at most 2000 bytes of UTF-8, so that much is sniffed first.
+_UCPL_MARKER = 'format: ucpl'
+_SNIFF_BYTES = 2000
+
+# Directory validation starts a process pool only for at least this many
+# UCPL files or this many bytes of them; below that, startup costs more
+PARALLEL_MIN_FILES = 64
+PARALLEL_MIN_BYTES = 4 << 20
+
 
 class UCPLValidator:
     """Validates UCPL files for bootstrappability."""
@@ -25,24 +48,37 @@ class UCPLValidator:
         self.warnings: List[str] = []
         self.info: List[str] = []
 
+    def _reset(self):
+        """Start fresh message lists, leaving the previous file's lists untouched."""
+        self.errors = []
+        self.warnings = []
+        self.info = []
+
     def validate_file(self, file_path: Path) -> bool:
         """Validate a single UCPL file. Returns True if valid."""
-        self.errors.clear()
-        self.warnings.clear()
-        self.info.clear()
-
         if not file_path.exists():
+            self._reset()
             self.errors.append(f"File not found: {file_path}")
             return False
 
-        content = file_path.read_text(encoding='utf-8')
+        return self.validate_content(read_text(str(file_path)))
+
+    def validate_content(self, content: str) -> bool:
+        """Validate already-read UCPL source text. Returns True if valid."""
+        return self.validate_document(UCPLDocument.from_text(content))
+
+    def validate_document(self, doc: UCPLDocument) -> bool:
+        """Validate an already-split UCPL document. Returns True if valid."""
+        self._reset()
 
         # Check for UUIP reference comment
-        if not self._check_uuip_comment(content):
+        if not self._check_uuip_comment(doc.content):
             self.warnings.append("Missing UUIP reference comment (<!-- UCPL: Expand with UUIP v1.0 | ... -->)")
 
-        # Extract and validate YAML header
-        header = self._extract_yaml_header(content)
+        # Validate YAML header (parsed once by UCPLDocument)
+        if doc.yaml_error is not None:
+            self.errors.append(f"Invalid YAML syntax: {doc.yaml_error}")
+        header = doc.header
         if header is None:
             self.errors.append("No valid YAML header found (must start with '---' and end with '---')")
             return False
@@ -59,7 +95,7 @@ class UCPLValidator:
         self._check_recommended_fields(header)
 
         # Validate UCPL content
-        ucpl_content = self._extract_ucpl_content(content)
+        ucpl_content = doc.body.strip()
         if not self._validate_ucpl_content(ucpl_content):
             return False
 
@@ -67,27 +103,11 @@ class UCPLValidator:
 
     def _check_uuip_comment(self, content: str) -> bool:
         """Check for UUIP reference comment at start of file."""
-        pattern = r'<!--\s*UCPL:\s*Expand with UUIP\s+v[\d.]+.*?-->'
-        return bool(re.search(pattern, content[:200]))
-
-    def _extract_yaml_header(self, content: str) -> Optional[Dict]:
-        """Extract YAML frontmatter from content."""
-        # Find YAML delimiters
-        matches = list(re.finditer(r'^---\s*$', content, re.MULTILINE))
-
-        if len(matches) < 2:
-            return None
-
-        # Extract YAML content between first two delimiters
-        start = matches[0].end()
-        end = matches[1].start()
-        yaml_content = content[start:end].strip()
-
-        try:
-            return yaml.safe_load(yaml_content)
-        except yaml.YAMLError as e:
-            self.errors.append(f"Invalid YAML syntax: {e}")
-            return None
+        head = content[:200]
+        # The comment must contain 'UUIP', so most files skip the regex entirely
+        if 'UUIP' not in head:
+            return False
+        return bool(_RE_UUIP_COMMENT.search(head))
 
     def _validate_required_fields(self, header: Dict) -> bool:
         """Validate that all required fields are present."""
@@ -141,15 +161,6 @@ class UCPLValidator:
         if header.get("strict") is None:
             self.info.append("Consider setting 'strict: true' for production prompts")
 
-    def _extract_ucpl_content(self, content: str) -> str:
-        """Extract UCPL content after YAML header."""
-        matches = list(re.finditer(r'^---\s*$', content, re.MULTILINE))
-
-        if len(matches) < 2:
-            return ""
-
-        return content[matches[1].end():].strip()
-
     def _validate_ucpl_content(self, content: str) -> bool:
         """Basic validation of UCPL syntax."""
         if not content:
@@ -157,13 +168,7 @@ class UCPLValidator:
             return False
 
         # Check for common UCPL patterns
-        ucpl_patterns = [
-            r'@\w+:',  # Directives
-            r'!\w+',   # Constraints
-            r'>\s*\w+', # Output operators
-        ]
-
-        has_ucpl = any(re.search(pattern, content) for pattern in ucpl_patterns)
+        has_ucpl = any(pattern.search(content) for pattern in _UCPL_PATTERNS)
 
         if not has_ucpl:
             self.warnings.append("No UCPL syntax detected (file may be plain text)")
@@ -172,47 +177,101 @@ class UCPLValidator:
 
     def print_results(self, file_path: Path, valid: bool):
         """Print validation results in a human-readable format."""
+        errors, warnings, info = self.errors, self.warnings, self.info
         status = "✓ VALID" if valid else "✗ INVALID"
         print(f"\n{status}: {file_path}")
 
-        if self.errors:
+        if errors:
             print("\n  Errors:")
-            for error in self.errors:
+            for error in errors:
                 print(f"    ✗ {error}")
 
-        if self.warnings:
+        if warnings:
             print("\n  Warnings:")
-            for warning in self.warnings:
+            for warning in warnings:
                 print(f"    ⚠ {warning}")
 
-        if self.info:
+        if info:
             print("\n  Info:")
-            for info_msg in self.info:
+            for info_msg in info:
                 print(f"    ℹ {info_msg}")
 
 
-def validate_directory(directory: Path) -> Tuple[int, int]:
-    """Validate all UCPL files in directory. Returns (valid_count, total_count)."""
+def _iter_markdown(directory: Path) -> Iterator[Path]:
+    """Yield every .md file under directory, in the same order as rglob."""
+    for dirpath, _, filenames in os.walk(directory):
+        for name in filenames:
+            if name.endswith('.md'):
+                yield Path(dirpath, name)
+
+
+def _has_ucpl_marker(file_path: Path) -> bool:
+    """Check a file's first bytes for the UCPL header marker without reading the rest."""
+    with open(file_path, 'rb') as f:
+        return _UCPL_MARKER.encode() in f.read(_SNIFF_BYTES)
+
+
+def _validate_one(file_path: Path) -> Optional[Tuple[bool, UCPLValidator]]:
+    """Validate one candidate file, possibly in a worker process (see _validate_all).
+
+    Returns None when the file has no UCPL header after all.
+    """
+    content = read_text(str(file_path))
+    if _UCPL_MARKER not in content[:500]:
+        return None
+
     validator = UCPLValidator()
+    return validator.validate_content(content), validator
 
+
+def _validate_all(ucpl_files: List[Path]) -> Iterator[Optional[Tuple[bool, UCPLValidator]]]:
+    """Yield _validate_one results in file order.
+
+    Small batches are validated in this process; a pool with one worker
+    per core only pays off past PARALLEL_MIN_FILES files or
+    PARALLEL_MIN_BYTES of input.
+    """
+    workers = min(os.cpu_count() or 1, len(ucpl_files))
+    if workers > 1 and len(ucpl_files) < PARALLEL_MIN_FILES:
+        total_size = sum(os.path.getsize(file_path) for file_path in ucpl_files)
+        if total_size < PARALLEL_MIN_BYTES:
+            workers = 1
+    if workers <= 1:
+        yield from map(_validate_one, ucpl_files)
+        return
+
+    # Imported here: loading multiprocessing costs more than validating a
+    # small directory
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Files are independent, so hand each worker one contiguous chunk
+    chunk_size = -(-len(ucpl_files) // workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_validate_one, ucpl_files, chunksize=chunk_size)
+
+
+def validate_directory(directory: Path) -> Tuple[int, int]:
+    """Validate all UCPL files in directory. Returns (valid_count, total_count)."""
     # Find all .md files that might be UCPL
-    ucpl_files = list(directory.rglob("*.md"))
+    markdown_files = list(_iter_markdown(directory))
 
-    if not ucpl_files:
+    if not markdown_files:
         print(f"No .md files found in {directory}")
         return 0, 0
 
+    # Sniff headers here so only real UCPL candidates reach the workers
+    ucpl_files = [file_path for file_path in markdown_files if _has_ucpl_marker(file_path)]
+
     valid_count = 0
     total_count = 0
 
-    for file_path in ucpl_files:
-        # Quick check if file has UCPL header
-        content = file_path.read_text(encoding='utf-8')
-        if 'format: ucpl' not in content[:500]:
+    # Results arrive in file order, so printing here keeps the output stable
+    for file_path, outcome in zip(ucpl_files, _validate_all(ucpl_files)):
+        if outcome is None:
             continue
 
         total_count += 1
-        is_valid = validator.validate_file(file_path)
+        is_valid, validator = outcome
         validator.print_results(file_path, is_valid)
 
         if is_valid: